@@ -0,0 +1,46 @@
+"""Shared fixtures for the benchmark scripts.
+
+The benchmarks run without an artifact, so they build a synthetic LBWSG
+category dictionary with the same name format and roughly the same shape
+as the GBD category set.
+"""
+import timeit
+from typing import Callable, Dict
+
+import numpy as np
+
+GESTATION_EDGES = [0, 24, 26, 28, 30, 32, 34, 36, 37, 38, 40, 42]
+BIRTH_WEIGHT_EDGES = [0, 500, 1000, 1500, 2000, 2500, 3000, 3500, 4000, 4500]
+
+
+def make_lbwsg_categories() -> Dict[str, str]:
+    """Builds a GBD style LBWSG category dictionary.
+
+    Heavy, very preterm births are not part of the GBD category set, so
+    cells with a birth weight lower bound well above what the gestational
+    age supports are dropped.  This leaves the same kind of holes in the
+    grid that the boundary case handling has to deal with.
+    """
+    categories = {}
+    cat_number = 2
+    for gt_start, gt_end in zip(GESTATION_EDGES[:-1], GESTATION_EDGES[1:]):
+        max_bw = 1000 + 150 * max(gt_end - 24, 0)
+        for bw_start, bw_end in zip(BIRTH_WEIGHT_EDGES[:-1], BIRTH_WEIGHT_EDGES[1:]):
+            if bw_start >= max_bw or (gt_start, bw_start) == (37, 1000):
+                # The second cell is added by the loader as the missing category.
+                continue
+            categories[f'cat{cat_number}'] = (f'Birth prevalence - [{gt_start}, {gt_end}) wks, '
+                                              f'[{bw_start}, {bw_end}) g')
+            cat_number += 1
+    return categories
+
+
+def make_exposure(n_categories: int, seed: int = 0) -> np.ndarray:
+    """Random category prevalences that sum to one."""
+    exposure = np.random.RandomState(seed).gamma(1.0, size=n_categories)
+    return exposure / exposure.sum()
+
+
+def time_call(func: Callable, repeat: int = 3) -> float:
+    """Best wall time of ``repeat`` calls to ``func`` in seconds."""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
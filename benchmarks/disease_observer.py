@@ -0,0 +1,103 @@
+"""Per-step cost of the disease observer's person time and transition counts.
+
+Compares the original implementation, which filters the population with a
+query per stratum, state and age group, with the single pass over stratum,
+state and age and sex group codes used by ``DiseaseObserver``.
+
+Usage::
+
+    python benchmarks/disease_observer.py
+
+"""
+import numpy as np
+import pandas as pd
+from vivarium_public_health.metrics.utilities import (get_output_template, get_group_counts,
+                                                      QueryString, to_years)
+
+from vivarium_conic_lsff import globals as project_globals
+from vivarium_conic_lsff.components.observers import (ResultsStratifier, ObservationTensor, get_age_sex_groups,
+                                                      get_state_codes, get_transition_lookup, get_transition_codes)
+
+from common import time_call
+
+POPULATION_SIZE = 100_000
+DISEASE = project_globals.DIARRHEA_MODEL_NAME
+CONFIG = {'by_age': True, 'by_sex': True, 'by_year': True}
+YEAR = 2021
+STEP_SIZE = pd.Timedelta(days=1)
+AGE_BINS = pd.DataFrame({
+    'age_group_name': ['Early Neonatal', 'Late Neonatal', 'Post Neonatal', '1 to 4'],
+    'age_start': [0.0, 7 / 365, 28 / 365, 1.0],
+    'age_end': [7 / 365, 28 / 365, 1.0, 5.0],
+})
+
+
+def make_population(n: int, states, random: np.random.RandomState) -> pd.DataFrame:
+    previous_state = random.choice(states, size=n, p=[0.9, 0.1])
+    # Roughly a tenth of simulants change state in a step.
+    changed = random.uniform(size=n) < 0.1
+    state = np.where(changed, np.where(previous_state == states[0], states[1], states[0]), previous_state)
+    return pd.DataFrame({
+        'alive': np.where(random.uniform(size=n) < 0.98, 'alive', 'dead'),
+        DISEASE: state,
+        f'previous_{DISEASE}': previous_state,
+        'age': random.uniform(0, 5, size=n),
+        'sex': random.choice(['Male', 'Female'], size=n),
+    })
+
+
+def query_observer_step(pop, strata, stratifier, states, transitions):
+    """The original per stratum, per state implementation."""
+    results = {}
+    for code, labels in enumerate(stratifier.labels):
+        pop_in_group = pop[strata == code]
+        for state in states:
+            base_key = get_output_template(**CONFIG).substitute(measure=f'{state}_person_time', year=YEAR)
+            base_filter = QueryString(f'alive == "alive" and {DISEASE} == "{state}"')
+            person_time = get_group_counts(pop_in_group, base_filter, base_key, CONFIG, AGE_BINS,
+                                           aggregate=lambda x: len(x) * to_years(STEP_SIZE))
+            results.update(stratifier.update_labels(person_time, labels))
+        for transition in transitions:
+            event_this_step = ((pop_in_group[f'previous_{DISEASE}'] == transition.from_state)
+                               & (pop_in_group[DISEASE] == transition.to_state))
+            base_key = get_output_template(**CONFIG).substitute(measure=f'{transition}_event_count', year=YEAR)
+            counts = get_group_counts(pop_in_group.loc[event_this_step], QueryString(''), base_key, CONFIG, AGE_BINS)
+            results.update(stratifier.update_labels(counts, labels))
+    return results
+
+
+def coded_observer_step(pop, strata, observations, states, transitions, transition_lookup):
+    """A step of the current ``DiseaseObserver``."""
+    group_codes, _ = get_age_sex_groups(pop, CONFIG, AGE_BINS)
+    state_codes = get_state_codes(pop[DISEASE], states)
+    state_codes[(pop.alive != 'alive').values] = -1
+    person_time = np.full(len(pop), to_years(STEP_SIZE))
+    observations.add_by_measure([f'{state}_person_time' for state in states], state_codes,
+                                YEAR, strata, group_codes, weights=person_time)
+    transition_codes = get_transition_codes(pop[f'previous_{DISEASE}'], pop[DISEASE], states, transition_lookup)
+    observations.add_by_measure([f'{transition}_event_count' for transition in transitions],
+                                transition_codes, YEAR, strata, group_codes)
+
+
+def main():
+    states = project_globals.DISEASE_MODEL_MAP[DISEASE]['states']
+    transitions = project_globals.DISEASE_MODEL_MAP[DISEASE]['transitions']
+    random = np.random.RandomState(1234)
+    pop = make_population(POPULATION_SIZE, states, random)
+    stratifier = ResultsStratifier('benchmark')
+    strata = random.randint(len(stratifier.labels), size=POPULATION_SIZE)
+
+    measures = ([f'{state}_person_time' for state in states]
+                + [f'{transition}_event_count' for transition in transitions])
+    observations = ObservationTensor(measures, CONFIG, [YEAR], AGE_BINS, stratifier)
+    transition_lookup = get_transition_lookup(states, transitions)
+
+    query = time_call(lambda: query_observer_step(pop, strata, stratifier, states, transitions))
+    coded = time_call(lambda: coded_observer_step(pop, strata, observations, states, transitions,
+                                                  transition_lookup))
+    print(f'{"simulants":>12} {"query (ms)":>12} {"coded (ms)":>12} {"speedup":>10}')
+    print(f'{POPULATION_SIZE:>12,} {query * 1e3:>12.1f} {coded * 1e3:>12.2f} {query / coded:>9.0f}x')
+
+
+if __name__ == '__main__':
+    main()
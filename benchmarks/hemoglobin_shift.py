@@ -0,0 +1,94 @@
+"""Per-call cost of the iron fortification shift on hemoglobin levels.
+
+Compares the original implementation, which builds multiplier series with
+label based assignment and subsets the population frame to covered
+simulants, with the fused array kernel used by
+``HemoglobinIronFortificationEffect``.
+
+Usage::
+
+    python benchmarks/hemoglobin_shift.py
+
+"""
+import numpy as np
+import pandas as pd
+
+from vivarium_conic_lsff import globals as project_globals
+from vivarium_conic_lsff.components.fortification.folic_acid import shift_hemoglobin
+
+from common import time_call
+
+POPULATION_SIZE = 100_000
+BASELINE_SHIFT = 0.8
+FORTIFICATION_EFFECT = 3.0
+START_AGE = project_globals.IRON_COVERAGE_START_AGE_COLUMN
+
+
+def make_population(n: int, random: np.random.RandomState) -> pd.DataFrame:
+    age = random.uniform(0, 5, size=n)
+    covered = random.uniform(size=n) < 0.5
+    return pd.DataFrame({
+        'age': age,
+        START_AGE: np.where(covered, age * random.uniform(size=n), np.nan),
+        'iron_responsive': random.uniform(size=n) < 0.4,
+        'hemoglobin': random.normal(110, 15, size=n),
+    })
+
+
+def legacy_age_fraction(pop_age: pd.Series) -> pd.Series:
+    multiplier = pd.Series(data=1, index=pop_age.index)
+    mask_under_half = pop_age < 0.5
+    mask_under_two = ((0.5 <= pop_age) & (pop_age < 2))
+    idx_under_half = mask_under_half[mask_under_half].index
+    idx_under_two = mask_under_two[mask_under_two].index
+    multiplier[idx_under_half] = 0
+    multiplier[idx_under_two] = (pop_age[idx_under_two] - 0.5) / 1.5
+    return multiplier
+
+
+def legacy_lag_fraction(pop_time_since_fortified: pd.Series) -> pd.Series:
+    multiplier = pd.Series(data=1, index=pop_time_since_fortified.index)
+    mask = pop_time_since_fortified < 0.5
+    idx = mask[mask].index
+    multiplier[idx] = pop_time_since_fortified[idx] / 0.5
+    return multiplier
+
+
+def legacy_shift(pop: pd.DataFrame) -> pd.Series:
+    """The original ``adjust_hemoglobin_levels``."""
+    pop_data = pop[['age', START_AGE]]
+    iron_responsive = pop.iron_responsive
+    hemoglobin_levels = pop.hemoglobin.copy()
+    hemoglobin_levels[iron_responsive] -= (BASELINE_SHIFT * legacy_age_fraction(pop_data.age))
+    idx_covered = pop_data.loc[(pop_data.age > 0.5)
+                               & (~pop_data.get(START_AGE).isnull())
+                               & iron_responsive].index
+    covered = pop_data.loc[idx_covered]
+    shift = (legacy_age_fraction(covered.age)
+             * legacy_lag_fraction(covered.age - covered[START_AGE])
+             * FORTIFICATION_EFFECT)
+    hemoglobin_levels.loc[idx_covered] += shift
+    return hemoglobin_levels
+
+
+def fused_shift(pop: pd.DataFrame) -> pd.Series:
+    """The current ``adjust_hemoglobin_levels``."""
+    hemoglobin = np.array(pop.hemoglobin.values, dtype=float)
+    shift_hemoglobin(hemoglobin, pop.age.values, pop[START_AGE].values, pop.iron_responsive.values,
+                     BASELINE_SHIFT, FORTIFICATION_EFFECT)
+    return pd.Series(hemoglobin, index=pop.index, name='hemoglobin')
+
+
+def main():
+    pop = make_population(POPULATION_SIZE, np.random.RandomState(1234))
+    if not np.allclose(legacy_shift(pop), fused_shift(pop), rtol=0, atol=1e-12):
+        raise AssertionError('The fused kernel does not match the original implementation.')
+
+    legacy = time_call(lambda: legacy_shift(pop))
+    fused = time_call(lambda: fused_shift(pop))
+    print(f'{"simulants":>12} {"legacy (ms)":>12} {"fused (ms)":>12} {"speedup":>10}')
+    print(f'{POPULATION_SIZE:>12,} {legacy * 1e3:>12.2f} {fused * 1e3:>12.2f} {legacy / fused:>9.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Throughput benchmark for the standalone LBWSG joint distribution.
+
+Times batched sampling, categorization and the mean relative risk outside
+of a simulation.
+
+Usage::
+
+    python benchmarks/lbwsg_joint_distribution.py
+
+"""
+import numpy as np
+
+from vivarium_conic_lsff import globals as project_globals
+from vivarium_conic_lsff.distributions import LBWSGJointDistribution
+
+from common import make_lbwsg_categories, make_exposure, time_call
+
+SAMPLE_SIZES = (100_000, 1_000_000, 10_000_000)
+DEMOGRAPHIC_ROWS = 1_000
+
+
+def main():
+    category_dict = make_lbwsg_categories()
+    category_dict[project_globals.LBWSG_MISSING_CATEGORY.CAT] = project_globals.LBWSG_MISSING_CATEGORY.NAME
+    exposure = np.array([make_exposure(len(category_dict), seed) for seed in range(DEMOGRAPHIC_ROWS)])
+    distribution = LBWSGJointDistribution(category_dict, exposure)
+    rng = np.random.RandomState(1234)
+
+    print(f'{"samples":>12} {"sample (M/s)":>14} {"categorize (M/s)":>18}')
+    for n in SAMPLE_SIZES:
+        birth_weight, gestation_time = distribution.sample(n, rng)
+        sample = time_call(lambda: distribution.sample(n, rng))
+        categorize = time_call(lambda: distribution.categorize(birth_weight, gestation_time))
+        print(f'{n:>12,} {n / sample / 1e6:>14.1f} {n / categorize / 1e6:>18.1f}')
+
+    rr_table = np.random.RandomState(1234).uniform(1, 10, size=exposure.shape)
+    mean_rr = time_call(lambda: distribution.mean_rr(rr_table))
+    print(f'mean_rr over {DEMOGRAPHIC_ROWS:,} demographic rows: {mean_rr * 1e3:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark for sampling continuous LBWSG exposures from categories.
+
+Compares the original row-wise ``DataFrame.apply`` sampler with the array
+based gather used by ``LBWSGJointDistribution.ppf``.
+
+Usage::
+
+    python benchmarks/lbwsg_sampling.py
+
+"""
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from vivarium_conic_lsff import globals as project_globals
+from vivarium_conic_lsff.distributions import (get_bounds_from_name, get_category_bounds,
+                                               sample_from_category_bounds)
+
+from common import make_lbwsg_categories, make_exposure, time_call
+
+POPULATION_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def get_category_dict() -> Dict[str, str]:
+    category_dict = make_lbwsg_categories()
+    category_dict[project_globals.LBWSG_MISSING_CATEGORY.CAT] = project_globals.LBWSG_MISSING_CATEGORY.NAME
+    return category_dict
+
+
+def get_categories_by_interval() -> pd.Series:
+    category_dict = get_category_dict()
+    intervals = []
+    for name in category_dict.values():
+        bw_start, bw_end, gt_start, gt_end = get_bounds_from_name(name)
+        intervals.append((pd.Interval(bw_start, bw_end, closed='left'),
+                          pd.Interval(gt_start, gt_end, closed='left')))
+    idx = pd.MultiIndex.from_tuples(intervals, names=project_globals.LBWSG_COLUMNS)
+    return pd.Series(list(category_dict.keys()), index=idx, name='cat')
+
+
+def row_wise_sampler(categorical_exposure, draws, intervals_by_category):
+    """The original per-simulant implementation."""
+    def single_values_from_category(row):
+        idx = row['index']
+        bw_draw = draws[project_globals.BIRTH_WEIGHT][idx]
+        gt_draw = draws[project_globals.GESTATION_TIME][idx]
+        intervals = intervals_by_category.loc[row['cat']]
+        birth_weight = (intervals.birth_weight.left
+                        + bw_draw * (intervals.birth_weight.right - intervals.birth_weight.left))
+        gestational_age = (intervals.gestation_time.left
+                           + gt_draw * (intervals.gestation_time.right - intervals.gestation_time.left))
+        return birth_weight, gestational_age
+
+    values = categorical_exposure.reset_index().apply(single_values_from_category, axis=1)
+    return pd.DataFrame(list(values), index=categorical_exposure.index, columns=project_globals.LBWSG_COLUMNS)
+
+
+def main():
+    categories_by_interval = get_categories_by_interval()
+    intervals_by_category = categories_by_interval.reset_index().set_index('cat')
+    lower_bounds, widths = get_category_bounds(get_category_dict().values())
+    exposure = make_exposure(len(categories_by_interval))
+    random = np.random.RandomState(1234)
+
+    print(f'{"simulants":>12} {"row-wise (s)":>14} {"vectorized (s)":>16} {"speedup":>10}')
+    for n in POPULATION_SIZES:
+        index = pd.RangeIndex(n)
+        category_index = random.choice(len(exposure), size=n, p=exposure)
+        draws = random.uniform(size=(n, 2))
+        categorical_exposure = pd.Series(categories_by_interval.values[category_index], index=index, name='cat')
+        draws_by_column = {project_globals.BIRTH_WEIGHT: pd.Series(draws[:, 0], index=index),
+                           project_globals.GESTATION_TIME: pd.Series(draws[:, 1], index=index)}
+
+        vectorized = time_call(lambda: sample_from_category_bounds(category_index, draws, lower_bounds, widths))
+        # The row-wise version takes minutes at a million simulants, so time it once.
+        row_wise = time_call(lambda: row_wise_sampler(categorical_exposure, draws_by_column,
+                                                      intervals_by_category), repeat=1)
+        print(f'{n:>12,} {row_wise:>14.4f} {vectorized:>16.4f} {row_wise / vectorized:>9.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,19 +2,25 @@ import typing
 
 import numpy as np
 import pandas as pd
-import scipy.stats
 from vivarium_public_health.utilities import to_years
 
 from vivarium_public_health.risks.distributions import clip
 
 from vivarium_conic_lsff import globals as project_globals
+from vivarium_conic_lsff.distributions import TabulatedPPF, get_hemoglobin_ppf
+from vivarium_conic_lsff.utilities import StepCache, get_codes, lookup_codes, to_categorical
 
 if typing.TYPE_CHECKING:
     from vivarium.framework.engine import Builder
+    from vivarium.framework.event import Event
     from vivarium.framework.population import SimulantData
 
 
 class IronDeficiency:
+    # Events after which the fortification modifiers of the exposure may
+    # have changed.
+    invalidating_events = ['time_step__prepare', 'time_step', 'time_step__cleanup',
+                           'collect_metrics', 'simulation_end']
 
     def __init__(self):
         self._distribution = IronDeficiencyDistribution()
@@ -58,8 +64,22 @@ class IronDeficiency:
 
         self.severity = builder.value.register_value_producer('anemia_severity',
                                                               source=self.get_severity)
-
-        columns_created = [f'{self.name}_propensity', 'iron_responsiveness_propensity']
+        # Severity, and through it the disability weights, are read by several
+        # observers every time step, so compute the exposure and severity once
+        # per event and hand out slices.  Iron responsiveness is determined by
+        # the severity of the raw exposure, as the fortification effect on the
+        # exposure depends on it, and is cached separately.
+        self._exposure_cache = StepCache(builder.time.clock(), self.exposure)
+        self._severity_cache = StepCache(builder.time.clock(), self._compute_severity)
+        self._responsiveness_cache = StepCache(builder.time.clock(), self._compute_responsiveness)
+        for event in self.invalidating_events:
+            builder.event.register_listener(event, self.on_event, priority=0)
+
+        # Raw exposure is a function of the fixed propensity and of exposure
+        # parameters that only change when a simulant moves into a new age or
+        # year bin, so it is stored along with the bin it was computed in.
+        columns_created = [f'{self.name}_propensity', 'iron_responsiveness_propensity',
+                           f'{self.name}_raw_exposure', f'{self.name}_exposure_bin']
         columns_required = ['age', 'sex']
 
         self.population_view = builder.population.get_view(columns_created + columns_required)
@@ -73,49 +93,70 @@ class IronDeficiency:
         iron_responsive_propensity = self.randomness.get_draw(pop_data.index, additional_key='iron_responsiveness')
         pop_update = pd.DataFrame({
             f'{self.name}_propensity': propensity,
-            f'iron_responsiveness_propensity': iron_responsive_propensity
+            f'iron_responsiveness_propensity': iron_responsive_propensity,
+            f'{self.name}_raw_exposure': np.nan,
+            f'{self.name}_exposure_bin': -1,
         }, index=pop_data.index)
         self.population_view.update(pop_update)
 
+    def on_event(self, event: 'Event'):
+        self._exposure_cache.invalidate()
+        self._severity_cache.invalidate()
+        self._responsiveness_cache.invalidate()
+
+    def get_current_exposure(self, index: pd.Index) -> pd.Series:
+        """Hemoglobin exposure for ``index``, computed at most once per
+        simulant per event."""
+        return self._exposure_cache(index)
+
     def get_exposure(self, index):
-        propensity = self.population_view.subview([f'{self.name}_propensity']).get(index).iron_deficiency_propensity
-        return self._compute_exposure(propensity)
+        propensity = f'{self.name}_propensity'
+        exposure = f'{self.name}_raw_exposure'
+        exposure_bin = f'{self.name}_exposure_bin'
+        pop = self.population_view.subview([propensity, exposure, exposure_bin, 'age']).get(index)
+        current_bin = self._distribution.get_parameter_bins(pop.age)
+        is_stale = current_bin != pop[exposure_bin].values
+        if is_stale.any():
+            stale = pop.index[is_stale]
+            update = pd.DataFrame({
+                exposure: self._compute_exposure(pop.loc[stale, propensity]).values,
+                exposure_bin: current_bin[is_stale],
+            }, index=stale)
+            self.population_view.update(update)
+            pop.loc[stale, exposure] = update[exposure]
+        return pop[exposure].rename('value')
 
     def get_disability_weight(self, index):
-        disability_data = self.raw_disability_weight(index)
-        severity = self.severity(index)
-        disability_weight = pd.Series(disability_data.lookup(index, severity), index=index)
-        return disability_weight
+        severity = self._severity_cache(index)
+        disability_weight = lookup_codes(self.raw_disability_weight(index), severity.values,
+                                         project_globals.CATEGORY_DTYPES.ANEMIA_SEVERITY.categories)
+        return pd.Series(disability_weight, index=index)
 
     def get_iron_responsive(self, index):
-        propensity = (self.population_view
-                      .subview(['iron_responsiveness_propensity'])
-                      .get(index)
-                      .iron_responsiveness_propensity)
-        severity = self._private_severity(index)
-        threshold = pd.Series(self.thresholds(index).lookup(index, severity), index=index)
-        iron_responsive = propensity < threshold
-        iron_responsive.name = 'iron_responsive'
-        return iron_responsive
-
-    def _private_severity(self, index):
-        exposure = self.get_exposure(index)
-        severity = self._get_severity(exposure)
-        return severity
+        return self._responsiveness_cache(index)
 
     def get_severity(self, index):
-        exposure = self.exposure(index)
-        severity = self._get_severity(exposure)
-        severity.name = 'anemia_severity'
-        return severity
+        return to_categorical(self._severity_cache(index).values, project_globals.CATEGORY_DTYPES.ANEMIA_SEVERITY,
+                              index, name='anemia_severity')
+
+    def _compute_severity(self, index):
+        exposure = self.get_current_exposure(index)
+        age = self.population_view.subview(['age']).get(index).age
+        return pd.Series(self._get_severity_codes(exposure.values, age.values), index=index)
+
+    def _compute_responsiveness(self, index):
+        pop = self.population_view.subview(['age', 'iron_responsiveness_propensity']).get(index)
+        severity = self._get_severity_codes(self.get_exposure(index).values, pop.age.values)
+        threshold = lookup_codes(self.thresholds(index), severity,
+                                 project_globals.CATEGORY_DTYPES.ANEMIA_SEVERITY.categories)
+        return pd.Series(pop.iron_responsiveness_propensity.values < threshold, index=index, name='iron_responsive')
 
     def _compute_exposure(self, propensity):
         return self._distribution.ppf(propensity)
 
-    def _get_severity(self, exposure):
-        age = self.population_view.subview(['age']).get(exposure.index).age
-        severity = pd.Series('none', index=exposure.index, name='anemia_severity')
-
+    @staticmethod
+    def _get_severity_codes(exposure: np.ndarray, age: np.ndarray) -> np.ndarray:
+        """Anemia severity codes in the ``anemia_severity`` dtype."""
         neonatal = age < to_years(pd.Timedelta(days=28))
         mild = ((neonatal & (130 <= exposure) & (exposure < 150))
                 | (~neonatal & (100 <= exposure) & (exposure < 110)))
@@ -123,10 +164,9 @@ class IronDeficiency:
                     | (~neonatal & (70 <= exposure) & (exposure < 100)))
         severe = ((neonatal & (exposure < 90))
                   | (~neonatal & (exposure < 70)))
-        severity.loc[mild] = 'mild'
-        severity.loc[moderate] = 'moderate'
-        severity.loc[severe] = 'severe'
-        return severity
+        dtype = project_globals.CATEGORY_DTYPES.ANEMIA_SEVERITY
+        none, *codes = get_codes(dtype, ['none', 'mild', 'moderate', 'severe'])
+        return np.select([mild, moderate, severe], codes, none)
 
     def load_iron_responsiveness_threshold(self, builder):
         data = []
@@ -165,6 +205,14 @@ class IronDeficiency:
 
 class IronDeficiencyDistribution:
 
+    configuration_defaults = {
+        project_globals.IRON_DEFICIENCY_MODEL_NAME: {
+            # Largest absolute error (g/L) of the tabulated hemoglobin ppf.
+            # Zero evaluates the exact ppf instead.
+            'ppf_tolerance': 0.001,
+        }
+    }
+
     @property
     def name(self):
         return f'{project_globals.IRON_DEFICIENCY_MODEL_NAME}_exposure_distribution'
@@ -179,29 +227,40 @@ class IronDeficiencyDistribution:
             source=exposure_data,
             requires_columns=['age', 'sex']
         )
+        self.clock = builder.time.clock()
+        self.age_bins = np.sort(exposure_parameters.age_start.unique())
+        self.year_bins = np.sort(exposure_parameters.year_start.unique())
+
+        tolerance = builder.configuration[project_globals.IRON_DEFICIENCY_MODEL_NAME].ppf_tolerance
+        if tolerance > 0:
+            # The parameters come from lookup tables, so there are only a few
+            # distinct distributions to tabulate.
+            lower, upper = clip(np.array([0., 1.]))
+            self._ppf = TabulatedPPF(get_hemoglobin_ppf, lower, upper, tolerance)
+            self._ppf.add_parameters(exposure_parameters[['mean', 'sd']].values)
+        else:
+            self._ppf = get_hemoglobin_ppf
+
+    def get_parameter_bins(self, age: pd.Series) -> np.ndarray:
+        """Codes of the age and year bins of the exposure parameter lookup
+        for each simulant at the current time.
+
+        Sex never changes, so simulants keep their exposure parameters for
+        as long as they keep their code.
+        """
+        # Order 0 interpolation with extrapolation, as in the lookup table.
+        time = self.clock()
+        year = time.year + time.timetuple().tm_yday / 365.25
+        age_bin = np.maximum(np.searchsorted(self.age_bins, age.values, side='right') - 1, 0)
+        year_bin = max(np.searchsorted(self.year_bins, year, side='right') - 1, 0)
+        return age_bin * len(self.year_bins) + year_bin
 
     def ppf(self, propensity: pd.Series) -> pd.Series:
         propensity = clip(propensity)
         exposure_data = self.exposure_parameters(propensity.index)
-        mean = exposure_data['mean']
-        sd = exposure_data['sd']
-        exposure = (project_globals.HEMOGLOBIN_DISTRIBUTION.WEIGHT_GAMMA * self._gamma_ppf(propensity, mean, sd)
-                    + project_globals.HEMOGLOBIN_DISTRIBUTION.WEIGHT_GUMBEL * self._mirrored_gumbel_ppf(propensity, mean, sd))
+        exposure = self._ppf(propensity.values, exposure_data['mean'].values, exposure_data['sd'].values)
         return pd.Series(exposure, index=propensity.index, name='value')
 
-    @staticmethod
-    def _gamma_ppf(propensity, mean, sd):
-        shape = (mean / sd)**2
-        scale = sd**2 / mean
-        return scipy.stats.gamma(a=shape, scale=scale).ppf(propensity)
-
-    @staticmethod
-    def _mirrored_gumbel_ppf(propensity, mean, sd):
-        x_max = project_globals.HEMOGLOBIN_DISTRIBUTION.EXPOSURE_MAX
-        alpha = x_max - mean - (sd * np.euler_gamma * np.sqrt(6) / np.pi)
-        scale = sd * np.sqrt(6) / np.pi
-        return x_max - scipy.stats.gumbel_r(alpha, scale=scale).ppf(1 - propensity)
-
     @staticmethod
     def load_exposure_parameters(builder):
         exposure_mean = builder.data.load(project_globals.IRON_DEFICIENCY_EXPOSURE).drop(columns=['parameter'])
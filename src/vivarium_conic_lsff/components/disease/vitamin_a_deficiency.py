@@ -1,10 +1,12 @@
 import typing
 
+import numpy as np
 import pandas as pd
 from vivarium.framework.values import list_combiner, union_post_processor
 from vivarium_public_health.risks.data_transformations import pivot_categorical
 
 from vivarium_conic_lsff import globals as project_globals
+from vivarium_conic_lsff.utilities import get_codes, to_categorical
 
 if typing.TYPE_CHECKING:
     from vivarium.framework.engine import Builder
@@ -86,6 +88,8 @@ class VitaminADeficiency:
             preferred_combiner=list_combiner,
             preferred_post_processor=union_post_processor
         )
+        self._exposure_dtype = project_globals.CATEGORY_DTYPES.VITAMIN_A_EXPOSURE
+        self._exposed_code, self._unexposed_code = get_codes(self._exposure_dtype, ['cat1', 'cat2'])
         self.exposure = builder.value.register_value_producer(
             f'{self.name}.exposure',
             source=self.get_current_exposure,
@@ -112,8 +116,7 @@ class VitaminADeficiency:
         propensity = self.randomness.get_draw(pop_data.index)
 
         exposure = self._get_sample_exposure(propensity)
-        disease_status = exposure.map({'cat1': project_globals.VITAMIN_A_WITH_CONDITION_STATE_NAME,
-                                       'cat2': project_globals.VITAMIN_A_SUSCEPTIBLE_STATE_NAME})
+        disease_status = self._get_disease_status(exposure)
         pop_update = pd.DataFrame({
             self.name: disease_status,
             project_globals.VITAMIN_A_BAD_EVENT_TIME: pd.NaT,
@@ -128,8 +131,7 @@ class VitaminADeficiency:
         pop = self.population_view.get(event.index, query='alive =="alive"')
         exposure = self.exposure(pop.index)
 
-        current_disease_status = exposure.map({'cat1': project_globals.VITAMIN_A_WITH_CONDITION_STATE_NAME,
-                                               'cat2': project_globals.VITAMIN_A_SUSCEPTIBLE_STATE_NAME})
+        current_disease_status = self._get_disease_status(exposure)
         old_disease_status = pop[self.name]
 
         incident_cases = ((old_disease_status == project_globals.VITAMIN_A_SUSCEPTIBLE_STATE_NAME)
@@ -162,7 +164,12 @@ class VitaminADeficiency:
         return self._get_sample_exposure(propensity)
 
     def _get_sample_exposure(self, propensity):
-        exposed = propensity < self.exposure_proportion(propensity.index)
-        exposure = pd.Series(exposed.replace({True: 'cat1', False: 'cat2'}),
-                             name=self.name + '_exposure', index=propensity.index)
-        return exposure
+        exposed = propensity.values < self.exposure_proportion(propensity.index).values
+        return to_categorical(np.where(exposed, self._exposed_code, self._unexposed_code), self._exposure_dtype,
+                              propensity.index, name=self.name + '_exposure')
+
+    def _get_disease_status(self, exposure):
+        with_condition = exposure.cat.codes.values == self._exposed_code
+        disease_status = np.where(with_condition, project_globals.VITAMIN_A_WITH_CONDITION_STATE_NAME,
+                                  project_globals.VITAMIN_A_SUSCEPTIBLE_STATE_NAME).astype(object)
+        return pd.Series(disease_status, index=exposure.index)
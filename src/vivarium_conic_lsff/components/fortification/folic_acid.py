@@ -8,6 +8,8 @@ from vivarium.framework.randomness import get_hash
 
 from vivarium_conic_lsff import globals as project_globals
 from vivarium_conic_lsff.components.fortification import parameters as params
+from vivarium_conic_lsff.distributions import PiecewiseLinearDistribution
+from vivarium_conic_lsff.utilities import get_codes, to_categorical
 
 if typing.TYPE_CHECKING:
     from vivarium.framework.engine import Builder
@@ -43,7 +45,8 @@ class FolicAcidAndIronFortificationCoverage:
         )
 
         iron_content_ratio = self.load_iron_content_ratio(builder)
-        self.iron_amount_distribution = IronAmountDistribution(params.FLOUR_QUANTILES, iron_content_ratio)
+        flour_consumption = params.get_flour_consumption_distribution(builder.configuration.input_data.location)
+        self.iron_amount_distribution = IronAmountDistribution(flour_consumption, iron_content_ratio)
         self.iron_amount = builder.value.register_value_producer(
             'iron_fortification.iron_amount', source=self.get_iron_amount)
 
@@ -62,6 +65,7 @@ class FolicAcidAndIronFortificationCoverage:
                            self._iron_fort_food_consumption]
 
         self.population_view = builder.population.get_view(created_columns + ['age'])
+        self._coverage_dtype = project_globals.CATEGORY_DTYPES.MATERNAL_FORTIFICATION_COVERAGE
 
         builder.population.initializes_simulants(self.on_initialize_simulants,
                                                  creates_columns=created_columns,
@@ -76,21 +80,24 @@ class FolicAcidAndIronFortificationCoverage:
         update_iron_coverage_start_age = pd.Series(np.nan, index=pop_data.index, name=self._iron_coverage_start_age)
         pop_age = self.population_view.subview(['age']).get(pop_data.index)
 
+        unknown, uncovered, covered = get_codes(self._coverage_dtype, ['unknown', 'uncovered', 'covered'])
+
         if pop_data.user_data['sim_state'] == 'setup':  # Initial population
-            update_maternal_folic_acid = pd.Series('unknown', index=pop_data.index, name=self._fa_column)
-            update_maternal_iron = pd.Series('unknown', index=pop_data.index, name=self._iron_fortified_mom_column)
+            update_maternal_folic_acid = to_categorical(np.full(len(pop_data.index), unknown), self._coverage_dtype,
+                                                        pop_data.index, name=self._fa_column)
+            update_maternal_iron = to_categorical(np.full(len(pop_data.index), unknown), self._coverage_dtype,
+                                                  pop_data.index, name=self._iron_fortified_mom_column)
             iron_covered = self.is_iron_covered(draw)
             update_iron_amount = self.iron_amount(pop_data.index, iron_covered)
             pop_update[self._iron_fort_propensity] = draw
         else:  # New sims
             effective_coverage_fa = self.fa_effective_coverage_level(pop_data.index)
-            update_maternal_folic_acid = pd.Series((draw < effective_coverage_fa).map({True: 'covered', False: 'uncovered'}),
-                                                   index=pop_data.index,
-                                                   name=self._fa_column)
+            update_maternal_folic_acid = to_categorical(np.where(draw < effective_coverage_fa, covered, uncovered),
+                                                        self._coverage_dtype, pop_data.index, name=self._fa_column)
             iron_covered = draw < self.iron_effective_coverage_level(pop_data.index)
-            update_maternal_iron = pd.Series((iron_covered).map({True: 'covered', False: 'uncovered'}),
-                                             index=pop_data.index,
-                                             name=self._iron_fortified_mom_column)
+            update_maternal_iron = to_categorical(np.where(iron_covered, covered, uncovered),
+                                                  self._coverage_dtype, pop_data.index,
+                                                  name=self._iron_fortified_mom_column)
             update_iron_amount = self.iron_amount(pop_data.index, iron_covered)
 
         update_iron_coverage_start_age.loc[iron_covered] = pop_age.loc[iron_covered].age
@@ -231,7 +238,8 @@ class MaternalIronFortificationEffect:
         baseline_iron_coverage = params.sample_iron_fortification_coverage(location, draw, 'baseline')
         iron_ratio = iron_content_ratio(draw, location)
         iron_effect = get_iron_bw_effect(draw, location)
-        baseline_shift = iron_effect * baseline_iron_coverage * params.MEAN_FLOUR_CONSUMPTION * iron_ratio
+        mean_flour_consumption = params.get_flour_consumption_distribution(location).mean
+        baseline_shift = iron_effect * baseline_iron_coverage * mean_flour_consumption * iron_ratio
         return (iron_effect, baseline_shift)
 
 
@@ -244,54 +252,27 @@ def get_iron_bw_effect(draw, location):
 
 
 class IronAmountDistribution():
-    def __init__(self, flour_quantiles, iron_ratio: float):
-        self._flour_quantiles = flour_quantiles
+    def __init__(self, flour_consumption: PiecewiseLinearDistribution, iron_ratio: float):
+        self._flour_consumption = flour_consumption
         self._iron_ratio = iron_ratio
 
     def ppf(self, propensity: pd.Series) -> pd.Series:
-        flour_consumption = pd.Series(0.0, index=propensity.index)
-        first_quartile = propensity < 0.25
-        first_quartile_p = propensity.loc[first_quartile]
-        flour_consumption.loc[first_quartile] = (first_quartile_p / 0.25) * self._flour_quantiles.Q1
-
-        second_quartile = ((0.25 <= propensity) & (propensity < 0.50))
-        second_quartile_p = propensity.loc[second_quartile]
-        flour_consumption.loc[second_quartile] = (((second_quartile_p - 0.25) / 0.25)
-                                                  * (self._flour_quantiles.Q2 - self._flour_quantiles.Q1)
-                                                  + self._flour_quantiles.Q1)
-
-        third_quartile = ((0.50 <= propensity) & (propensity < 0.75))
-        third_quartile_p = propensity.loc[third_quartile]
-        flour_consumption.loc[third_quartile] = (((third_quartile_p - 0.50) / 0.25)
-                                                 * (self._flour_quantiles.Q3 - self._flour_quantiles.Q2)
-                                                 + self._flour_quantiles.Q2)
-
-        fourth_quartile = (0.75 <= propensity)
-        fourth_quartile_p = propensity.loc[fourth_quartile]
-        flour_consumption.loc[fourth_quartile] = (((fourth_quartile_p - 0.75) / 0.25)
-                                                  * (self._flour_quantiles.Q4 - self._flour_quantiles.Q3)
-                                                  + self._flour_quantiles.Q3)
+        flour_consumption = self._flour_consumption.ppf(propensity.values)
+        return pd.Series(flour_consumption * self._iron_ratio, index=propensity.index)
 
-        return flour_consumption * self._iron_ratio
 
-
-def hb_age_fraction(pop_age: pd.Series) -> pd.Series:
+def hb_age_fraction(age: np.ndarray, out: np.ndarray = None) -> np.ndarray:
     """
     Multiplier on Hb effect size due to children eating less food at younger
     ages. (`age` is current age in years).
     return 0 if age<0.5 else (age-0.5)/1.5 if age<2 else 1
     """
-    multiplier = pd.Series(data=1, index=pop_age.index)
-    mask_under_half = pop_age < 0.5
-    mask_under_two = ((0.5 <= pop_age) & (pop_age < 2))
-    idx_under_half = mask_under_half[mask_under_half].index
-    idx_under_two = mask_under_two[mask_under_two].index
-    multiplier[idx_under_half] = 0
-    multiplier[idx_under_two] = (pop_age[idx_under_two] - 0.5) / 1.5
-    return multiplier
+    out = np.subtract(age, 0.5, out=out)
+    out /= 1.5
+    return np.clip(out, 0., 1., out=out)
 
 
-def hb_lag_fraction(pop_time_since_fortified: pd.Series) -> pd.Series:
+def hb_lag_fraction(time_since_fortified: np.ndarray, out: np.ndarray = None) -> np.ndarray:
     """
     Multiplier on Hb effect size due to lag in response time to iron fortification.
     The argument `time_since_fortified` is the time (in years) since a simulant
@@ -300,11 +281,45 @@ def hb_lag_fraction(pop_time_since_fortified: pd.Series) -> pd.Series:
     return (0 if time_since_fortified < 0
             else time_since_fortified/0.5  if time_since_fortified < 0.5 else 1)
     """
-    multiplier = pd.Series(data=1, index=pop_time_since_fortified.index)
-    mask = pop_time_since_fortified < 0.5
-    idx = mask[mask].index
-    multiplier[idx] = pop_time_since_fortified[idx] / 0.5
-    return multiplier
+    out = np.divide(time_since_fortified, 0.5, out=out)
+    return np.clip(out, 0., 1., out=out)
+
+
+def shift_hemoglobin(hemoglobin: np.ndarray, age: np.ndarray, coverage_start_age: np.ndarray,
+                     iron_responsive: np.ndarray, baseline_shift: float, fortification_effect: float):
+    """Applies the iron fortification effect to hemoglobin levels in place.
+
+    The baseline fortification effect, scaled by age, is removed from iron
+    responsive simulants.  Iron responsive simulants over six months old who
+    eat fortified food then gain the fortification effect, scaled by age and
+    by the time since they started eating it.
+
+    Parameters
+    ----------
+    hemoglobin
+        Hemoglobin levels, updated in place.
+    age
+        Simulant ages in years.
+    coverage_start_age
+        The age each simulant started eating fortified food, or NaN if
+        they have not.
+    iron_responsive
+        Whether each simulant's anemia responds to iron.
+    baseline_shift
+        The population average fortification effect at baseline coverage.
+    fortification_effect
+        The fortification effect on hemoglobin.
+
+    """
+    age_fraction = hb_age_fraction(age)
+    shift = np.multiply(age_fraction, baseline_shift)
+    np.subtract(hemoglobin, shift, out=hemoglobin, where=iron_responsive)
+
+    covered = iron_responsive & (age > 0.5) & ~np.isnan(coverage_start_age)
+    shift = hb_lag_fraction(np.subtract(age, coverage_start_age, out=shift), out=shift)
+    shift *= age_fraction
+    shift *= fortification_effect
+    np.add(hemoglobin, shift, out=hemoglobin, where=covered)
 
 
 class HemoglobinIronFortificationEffect:
@@ -325,21 +340,11 @@ class HemoglobinIronFortificationEffect:
     def adjust_hemoglobin_levels(self, index, hemoglobin_levels):
         baseline_shift, hemoglobin_fortification_effect = self.treatment_effects
         pop_data = self.population_view.get(index)
-        hemoglobin_levels[self.iron_responsive(index)] -= (baseline_shift * hb_age_fraction(pop_data.age))
-        idx_covered = pop_data.loc[(pop_data.age > 0.5)
-                                   & (~pop_data.get(project_globals.IRON_COVERAGE_START_AGE_COLUMN).isnull())
-                                   & self.iron_responsive(index)].index
-        shift = self.compute_shift(pop_data.loc[idx_covered], hemoglobin_fortification_effect)
-        hemoglobin_levels.loc[idx_covered] += shift
-        return hemoglobin_levels
-
-    def compute_shift(self, pop_data: pd.DataFrame, hemoglobin_fortification_effect : float) -> pd.Series:
-        coverage_start_age = pop_data.get(project_globals.IRON_COVERAGE_START_AGE_COLUMN)
-        coverage_duration = pop_data.age - coverage_start_age
-        shift = (hb_age_fraction(pop_data.age)
-                 * hb_lag_fraction(coverage_duration)
-                 * hemoglobin_fortification_effect)
-        return shift
+        hemoglobin = np.array(hemoglobin_levels.values, dtype=float)
+        shift_hemoglobin(hemoglobin, pop_data.age.values,
+                         pop_data[project_globals.IRON_COVERAGE_START_AGE_COLUMN].values,
+                         self.iron_responsive(index).values, baseline_shift, hemoglobin_fortification_effect)
+        return pd.Series(hemoglobin, index=hemoglobin_levels.index, name=hemoglobin_levels.name)
 
     @staticmethod
     def load_treatment_effects(builder: 'Builder'):
@@ -9,6 +9,7 @@ from vivarium_conic_lsff.utilities import (BetaParams, sample_beta_distribution,
                                            )
 
 from vivarium_conic_lsff import globals as project_globals
+from vivarium_conic_lsff.distributions import PiecewiseLinearDistribution
 
 FOLIC_ACID_COVERAGE = {
     'Ethiopia': [
@@ -331,6 +332,14 @@ class __FlourQuantiles(NamedTuple):
 
 FLOUR_QUANTILES = __FlourQuantiles()
 
+# Quantiles of daily flour consumption (g), evenly spaced in probability
+# from 0 to 1.  Any number of quantiles may be given for a location.
+FLOUR_QUANTILES_PER_LOCATION = {
+    project_globals.LOCATIONS.ETHIOPIA: FLOUR_QUANTILES,
+    project_globals.LOCATIONS.INDIA: FLOUR_QUANTILES,
+    project_globals.LOCATIONS.NIGERIA: FLOUR_QUANTILES,
+}
+
 
 IRON_FORTIFICATION_RELATIVE_RISK = LogNormParams.from_statistics(
     median=1.71,
@@ -344,11 +353,8 @@ def sample_iron_fortification_coverage(location: str, draw: int, coverage_time:
     return sum([coverage_params['weight'] * sample_beta_distribution(seed, coverage_params[coverage_time])
                 for coverage_params in IRON_FORTIFICATION_COVERAGE[location]])
 
-MEAN_FLOUR_CONSUMPTION = (
-    ((FLOUR_QUANTILES.Q0 + (FLOUR_QUANTILES.Q1 - FLOUR_QUANTILES.Q0) / 2) +
-    (FLOUR_QUANTILES.Q1 + (FLOUR_QUANTILES.Q2 - FLOUR_QUANTILES.Q1) / 2) +
-    (FLOUR_QUANTILES.Q2 + (FLOUR_QUANTILES.Q3 - FLOUR_QUANTILES.Q2) / 2) +
-    (FLOUR_QUANTILES.Q3 + (FLOUR_QUANTILES.Q4 - FLOUR_QUANTILES.Q3) / 2)) / 4)
+def get_flour_consumption_distribution(location: str) -> PiecewiseLinearDistribution:
+    return PiecewiseLinearDistribution(FLOUR_QUANTILES_PER_LOCATION[location])
 
 
 
@@ -1,12 +1,14 @@
 """Vitamin a fortification model."""
 import typing
 
+import numpy as np
 import pandas as pd
 
 from vivarium_conic_lsff.components.fortification.parameters import (sample_vitamin_a_coverage,
                                                                      sample_vitamin_a_relative_risk,
                                                                      sample_vitamin_a_time_to_effect)
 from vivarium_conic_lsff import globals as project_globals
+from vivarium_conic_lsff.utilities import get_codes, lookup_categorical, to_categorical
 
 if typing.TYPE_CHECKING:
     from vivarium.framework.engine import Builder
@@ -50,6 +52,11 @@ class VitaminAFortificationCoverage:
             'vitamin_a_fortification.effectively_covered',
             source=self.get_effectively_covered)
 
+        # Effective coverage is encoded as the vitamin A deficiency risk
+        # category it implies, with cat2 being covered.
+        self._exposure_dtype = project_globals.CATEGORY_DTYPES.VITAMIN_A_EXPOSURE
+        self._uncovered_code, self._covered_code = get_codes(self._exposure_dtype, ['cat1', 'cat2'])
+
         time_to_effect_data = self.load_time_to_effect_data(builder)
         self.time_to_effect = builder.lookup.build_table(time_to_effect_data)
 
@@ -93,10 +100,9 @@ class VitaminAFortificationCoverage:
         coverage_start_time = pop[project_globals.VITAMIN_A_COVERAGE_START_COLUMN]
         time_to_effect = self.time_to_effect(index)
         # noinspection PyTypeChecker
-        effectively_covered = (curr_time - coverage_start_time) > time_to_effect
-        effectively_covered = effectively_covered.map({True: 'cat2', False: 'cat1'})
-        effectively_covered.name = 'value'
-        return effectively_covered
+        effectively_covered = ((curr_time - coverage_start_time) > time_to_effect).values
+        return to_categorical(np.where(effectively_covered, self._covered_code, self._uncovered_code),
+                              self._exposure_dtype, index, name='value')
 
     def is_covered(self, propensity: pd.Series) -> pd.Series:
         """Helper method for finding covered people from their propensity."""
@@ -154,7 +160,7 @@ class VitaminAFortificationEffect:
     def adjust_vitamin_a_exposure_probability(self, index: pd.Index, exposure_probability: pd.Series) -> pd.Series:
         """Value modifier for vitamin a deficiency exposure."""
         effectively_covered = self.effectively_covered(index)
-        rr = self.relative_risk(index).lookup(index, effectively_covered)
+        rr = lookup_categorical(self.relative_risk(index), effectively_covered)
         return exposure_probability * rr
 
     @staticmethod
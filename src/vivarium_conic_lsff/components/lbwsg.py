@@ -5,24 +5,35 @@ implementation that has been used in several public health models.
 Note that because the input data is so large, it relies on a custom relative
 risk data loader that expects data saved in keys by draw.
 """
-from typing import Tuple
+from typing import Dict
 
+import numpy as np
 import pandas as pd
 from vivarium_public_health.utilities import EntityString, TargetString
 from vivarium_public_health.risks.data_transformations import pivot_categorical
 
 from vivarium_conic_lsff import globals as project_globals
+from vivarium_conic_lsff.data import artifact_cache
+from vivarium_conic_lsff.distributions import LBWSGJointDistribution, correct_boundary_cases
+from vivarium_conic_lsff.utilities import StepCache, to_categorical
 
 
 class LBWSGRisk:
 
+    def __init__(self):
+        self.data = LBWSGData()
+        self.exposure_distribution = LBWSGDistribution(self.data)
+
     @property
     def name(self):
         return f"risk.{project_globals.LBWSG_MODEL_NAME}"
 
+    @property
+    def sub_components(self):
+        return [self.data, self.exposure_distribution]
+
     def setup(self, builder):
         self.risk = EntityString(f'risk_factor.{project_globals.LBWSG_MODEL_NAME}')
-        self.exposure_distribution = LBWSGDistribution(builder)
 
         # FIXME: These are not actual birth weights/gestational times, but the
         # raw values that source pipelines.  They should use different column
@@ -46,6 +57,9 @@ class LBWSGRisk:
             preferred_post_processor=self.exposure_distribution.convert_to_categorical,
             requires_values=f'{self.risk.name}.raw_exposure'
         )
+        # The categorical exposure is needed by every risk effect on every
+        # time step, so compute it once per step and hand out slices.
+        self._exposure_cache = StepCache(builder.time.clock(), self.exposure)
 
     def on_initialize_simulants(self, pop_data):
         exposure = self.exposure_distribution.get_birth_weight_and_gestational_age(pop_data.index)
@@ -54,152 +68,121 @@ class LBWSGRisk:
             project_globals.GESTATION_TIME: exposure[project_globals.GESTATION_TIME]
         }, index=pop_data.index)
         self.population_view.update(df)
+        # Both the LBWSG columns and the maternal iron fortification columns
+        # that modify the exposure are only written when simulants are
+        # initialized.
+        self._exposure_cache.invalidate(pop_data.index)
+
+    def get_current_exposure(self, index: pd.Index) -> pd.Series:
+        """Categorical exposure for ``index``, computed at most once per
+        simulant per time step."""
+        return self._exposure_cache(index)
 
 
-# FIXME: This class is not a clear representation of the lbwsg distribution.
-# It should act as a standalone (e.g. a library) class that could be used
-# to stand up and sample from the distribution outside the simulation, because
-# we have definite need of that.  A possibility is to port it to the
-# risk_distributions library and construct a simulation wrapper like we do
-# with the ensemble distributions in vph.
 class LBWSGDistribution:
+    """Simulation wrapper around :class:`LBWSGJointDistribution` that draws
+    from the common random number streams and the exposure lookup table."""
 
-    def __init__(self, builder):
+    def __init__(self, data: 'LBWSGData'):
         self.risk = EntityString(f'risk_factor.{project_globals.LBWSG_MODEL_NAME}')
-        self.randomness = builder.randomness.get_stream(f'{self.risk.name}.exposure')
+        self.data = data
 
-        self.categories_by_interval = get_lbwsg_categories_by_interval(builder)
-        self.intervals_by_category = self.categories_by_interval.reset_index().set_index('cat')
-        self.max_gt_by_bw, self.max_bw_by_gt = self._get_boundary_mappings()
+    @property
+    def name(self):
+        return f'{project_globals.LBWSG_MODEL_NAME}_exposure_distribution'
 
-        self.exposure_parameters = builder.lookup.build_table(self.get_exposure_data(builder),
-                                                              key_columns=['sex'],
-                                                              parameter_columns=['age', 'year'])
+    def setup(self, builder):
+        self.randomness = builder.randomness.get_stream(f'{self.risk.name}.exposure')
+        self.distribution = self.data.distribution
+        self.exposure_parameters = self.data.exposure
+        self.dtype = pd.CategoricalDtype(self.distribution.categories)
 
     def get_birth_weight_and_gestational_age(self, index):
         category_draw = self.randomness.get_draw(index, additional_key='category')
-        exposure = self.exposure_parameters(index)[self.categories_by_interval.values]
-        exposure_sum = exposure.cumsum(axis='columns')
-        category_index = (exposure_sum.T < category_draw).T.sum('columns')
-        categorical_exposure = pd.Series(self.categories_by_interval.values[category_index],
-                                         index=index, name='cat')
-        return self._convert_to_continuous(categorical_exposure)
+        bw_draw = self.randomness.get_draw(index, additional_key=project_globals.BIRTH_WEIGHT)
+        gt_draw = self.randomness.get_draw(index, additional_key=project_globals.GESTATION_TIME)
+        exposure = self.exposure_parameters(index)[self.distribution.categories].values
+        birth_weight, gestation_time = self.distribution.ppf(category_draw.values, bw_draw.values,
+                                                             gt_draw.values, exposure)
+        return pd.DataFrame({
+            project_globals.BIRTH_WEIGHT: birth_weight,
+            project_globals.GESTATION_TIME: gestation_time,
+        }, index=index)
 
     def convert_to_categorical(self, exposure, _):
         # FIXME: DIRTY HACK.  The problem with absolute shifts is that
         #  they can take you way out of a realistic domain for your
         #  values.  Like giving people negative birth weights
-        birth_weight = exposure[project_globals.BIRTH_WEIGHT]
-        exposure.loc[birth_weight < 100, project_globals.BIRTH_WEIGHT] = 100
-        exposure = self._convert_boundary_cases(exposure)
-        categorical_exposure = self.categories_by_interval.iloc[self._get_categorical_index(exposure)]
-        categorical_exposure.index = exposure.index
-        return categorical_exposure
-
-    def _convert_boundary_cases(self, exposure):
-        birth_weight = exposure[project_globals.BIRTH_WEIGHT]
-        gestation_time = exposure[project_globals.GESTATION_TIME]
-        eps = 1e-4
-        outside_bounds = self._get_categorical_index(exposure) == -1
-        shift_down = outside_bounds & (
-                (birth_weight < 1000)
-                | ((1000 < birth_weight) & (birth_weight < project_globals.MAX_BIRTH_WEIGHT)
-                   & (40 < gestation_time))
-        )
-        shift_left = outside_bounds & (
-            ((1000 < birth_weight) & (gestation_time < 34))
-                | ((project_globals.MAX_BIRTH_WEIGHT < birth_weight)
-                   & (gestation_time < project_globals.MAX_GESTATIONAL_TIME))
-        )
-        tmrel = outside_bounds & (
-                (project_globals.MAX_BIRTH_WEIGHT < birth_weight)
-                & (project_globals.MAX_GESTATIONAL_TIME < gestation_time)
-        )
+        values = exposure[project_globals.LBWSG_COLUMNS].values.astype(float)
+        np.maximum(values[:, 0], 100, out=values[:, 0])
+        category_index = correct_boundary_cases(self.distribution.grid, values)
+        # Values no category covers map to the last, missing, category.
+        category_index[category_index < 0] = len(self.dtype.categories) - 1
+        return to_categorical(category_index, self.dtype, exposure.index, name='cat')
 
-        max_gt_for_bw = self.max_gt_by_bw.loc[exposure.loc[shift_down, project_globals.BIRTH_WEIGHT]].values
-        exposure.loc[shift_down, project_globals.GESTATION_TIME] = max_gt_for_bw - eps
 
-        max_bw_for_gt = self.max_bw_by_gt.loc[exposure.loc[shift_left, project_globals.GESTATION_TIME]].values
-        exposure.loc[shift_left, project_globals.BIRTH_WEIGHT] = max_bw_for_gt - eps
+class LBWSGData:
+    """Loads the LBWSG exposure and relative risk data once per simulation.
 
-        exposure.loc[tmrel, project_globals.GESTATION_TIME] = project_globals.MAX_GESTATIONAL_TIME - eps
-        exposure.loc[tmrel, project_globals.BIRTH_WEIGHT] = project_globals.MAX_BIRTH_WEIGHT - eps
+    The wide exposure and relative risk tables and the population
+    attributable fraction derived from them are the same for every LBWSG
+    risk effect, so they are built here once and shared by the exposure
+    distribution and all :class:`LBWSGRiskEffect` components.
+    """
 
-        return exposure
+    @property
+    def name(self):
+        return f'{project_globals.LBWSG_MODEL_NAME}_data'
 
-    def _get_categorical_index(self, exposure):
-        exposure_bw_gt_index = exposure.set_index(project_globals.LBWSG_COLUMNS).index
-        return self.categories_by_interval.index.get_indexer(exposure_bw_gt_index, method=None)
+    def setup(self, builder):
+        exposure_data = get_exposure_data(builder)
+        relative_risk_data = get_relative_risk_data(builder)
+        paf_data = get_population_attributable_fraction_data(exposure_data, relative_risk_data)
 
-    def _convert_to_continuous(self, categorical_exposure):
-        birth_weight_draw = self.randomness.get_draw(categorical_exposure.index,
-                                                     additional_key=project_globals.BIRTH_WEIGHT)
-        gestational_time_draw = self.randomness.get_draw(categorical_exposure.index,
-                                                         additional_key=project_globals.GESTATION_TIME)
-        draws = {project_globals.BIRTH_WEIGHT: birth_weight_draw,
-                 project_globals.GESTATION_TIME: gestational_time_draw}
+        category_dict = get_lbwsg_categories(builder)
+        self.distribution = LBWSGJointDistribution(category_dict, exposure_data[list(category_dict)].values)
 
-        def single_values_from_category(row):
-            idx = row['index']
-            bw_draw = draws[project_globals.BIRTH_WEIGHT][idx]
-            gt_draw = draws[project_globals.GESTATION_TIME][idx]
+        self.exposure = builder.lookup.build_table(exposure_data,
+                                                   key_columns=['sex'],
+                                                   parameter_columns=['age', 'year'])
+        self.relative_risk = LBWSGRelativeRisk(builder, relative_risk_data)
+        self.population_attributable_fraction = builder.lookup.build_table(paf_data,
+                                                                           key_columns=['sex'],
+                                                                           parameter_columns=['age', 'year'])
 
-            intervals = self.intervals_by_category.loc[row['cat']]
 
-            birth_weight = (intervals.birth_weight.left
-                            + bw_draw * (intervals.birth_weight.right - intervals.birth_weight.left))
-            gestational_age = (intervals.gestation_time.left
-                               + gt_draw * (intervals.gestation_time.right - intervals.gestation_time.left))
+def get_exposure_data(builder):
+    exposure = read_data_by_draw(builder, project_globals.LBWSG_EXPOSURE)
+    exposure = pivot_categorical(exposure)
+    exposure[project_globals.LBWSG_MISSING_CATEGORY.CAT] = project_globals.LBWSG_MISSING_CATEGORY.EXPOSURE
+    return exposure
 
-            return birth_weight, gestational_age
 
-        values = categorical_exposure.reset_index().apply(single_values_from_category, axis=1)
-        return pd.DataFrame(list(values), index=categorical_exposure.index,
-                            columns=project_globals.LBWSG_COLUMNS)
+def get_relative_risk_data(builder):
+    relative_risk_data = read_data_by_draw(builder, project_globals.LBWSG_RELATIVE_RISK)
+    correct_target = ((relative_risk_data['affected_entity'] == 'all')
+                      & (relative_risk_data['affected_measure'] == 'excess_mortality_rate'))
+    relative_risk_data = (relative_risk_data[correct_target]
+                          .drop(columns=['affected_entity', 'affected_measure']))
+    relative_risk_data = pivot_categorical(relative_risk_data)
+    relative_risk_data[project_globals.LBWSG_MISSING_CATEGORY.CAT] = (relative_risk_data['cat106']
+                                                                      + relative_risk_data['cat116']) / 2
+    return relative_risk_data
 
-    def _get_boundary_mappings(self):
-        cats = self.categories_by_interval.reset_index()
-        max_gt_by_bw = pd.Series({bw_interval: pd.Index(group.gestation_time).right.max()
-                                  for bw_interval, group in cats.groupby(project_globals.BIRTH_WEIGHT)})
-        max_bw_by_gt = pd.Series({gt_interval: pd.Index(group.birth_weight).right.max()
-                                  for gt_interval, group in cats.groupby(project_globals.GESTATION_TIME)})
-        return max_gt_by_bw, max_bw_by_gt
 
-    @staticmethod
-    def get_exposure_data(builder):
-        exposure = read_data_by_draw(builder, project_globals.LBWSG_EXPOSURE)
-        exposure = pivot_categorical(exposure)
-        exposure[project_globals.LBWSG_MISSING_CATEGORY.CAT] = project_globals.LBWSG_MISSING_CATEGORY.EXPOSURE
-        return exposure
+def get_population_attributable_fraction_data(exposure_data, relative_risk_data):
+    index_columns = ['sex', 'age_start', 'age_end', 'year_start', 'year_end']
+    rr_data = relative_risk_data.set_index(index_columns)
+    exposure_data = exposure_data.set_index(index_columns)
+    mean_rr = (rr_data * exposure_data).sum(axis=1)
+    paf_data = ((mean_rr - 1)/mean_rr).reset_index().rename(columns={0: 'value'})
+    return paf_data
 
 
-def get_lbwsg_categories_by_interval(builder):
+def get_lbwsg_categories(builder) -> Dict[str, str]:
     category_dict = builder.data.load(project_globals.LBWSG_CATEGORIES)
     category_dict[project_globals.LBWSG_MISSING_CATEGORY.CAT] = project_globals.LBWSG_MISSING_CATEGORY.NAME
-    cats = (pd.DataFrame.from_dict(category_dict, orient='index')
-            .reset_index()
-            .rename(columns={'index': 'cat', 0: 'name'}))
-    idx = pd.MultiIndex.from_tuples(cats.name.apply(get_intervals_from_name),
-                                    names=project_globals.LBWSG_COLUMNS)
-    cats = cats['cat']
-    cats.index = idx
-    return cats
-
-
-def get_intervals_from_name(name: str) -> Tuple[pd.Interval, pd.Interval]:
-    """Converts a LBWSG category name to a pair of intervals.
-
-    The first interval corresponds to gestational age in weeks, the
-    second to birth weight in grams.
-    """
-    numbers_only = (name.replace('Birth prevalence - [', '')
-                    .replace(',', '')
-                    .replace(') wks [', ' ')
-                    .replace(') g', ''))
-    numbers_only = [int(n) for n in numbers_only.split()]
-    # FIXME: The raw ordering here is brittle
-    return (pd.Interval(numbers_only[2], numbers_only[3], closed='left'),
-            pd.Interval(numbers_only[0], numbers_only[1], closed='left'))
+    return category_dict
 
 
 class LBWSGRiskEffect:
@@ -224,14 +207,11 @@ class LBWSGRiskEffect:
         return f"risk_effect.{self.risk}.{self.target}"
 
     def setup(self, builder):
-        rr_data = self.get_relative_risk_data(builder)
-        paf_data = self.get_population_attributable_fraction_data(builder)
-        self.relative_risk = builder.lookup.build_table(rr_data,
-                                                        key_columns=['sex'],
-                                                        parameter_columns=['age', 'year'])
-        self.population_attributable_fraction = builder.lookup.build_table(paf_data,
-                                                                           key_columns=['sex'],
-                                                                           parameter_columns=['age', 'year'])
+        # The relative risk and PAF tables don't depend on the target, so
+        # every effect shares the ones built by the risk.
+        data = builder.components.get_components_by_type(LBWSGData)[0]
+        self.relative_risk = data.relative_risk
+        self.population_attributable_fraction = data.population_attributable_fraction
 
         self.exposure_effect = self.get_exposure_effect(builder)
 
@@ -242,52 +222,48 @@ class LBWSGRiskEffect:
             modifier=self.population_attributable_fraction)
 
     def adjust_target(self, index, target):
-        return self.exposure_effect(target, self.relative_risk(index))
-
-    def get_relative_risk_data(self, builder):
-        relative_risk_data = read_data_by_draw(builder, f'{self.risk}.relative_risk')
-        correct_target = ((relative_risk_data['affected_entity'] == 'all')
-                          & (relative_risk_data['affected_measure'] == 'excess_mortality_rate'))
-        relative_risk_data = (relative_risk_data[correct_target]
-                              .drop(['affected_entity', 'affected_measure'], 'columns'))
-        relative_risk_data = pivot_categorical(relative_risk_data)
-        relative_risk_data[project_globals.LBWSG_MISSING_CATEGORY.CAT] = (relative_risk_data['cat106']
-                                                                          + relative_risk_data['cat116']) / 2
-        return relative_risk_data
-
-    def get_population_attributable_fraction_data(self, builder):
-        index_columns = ['sex', 'age_start', 'age_end', 'year_start', 'year_end']
-        rr_data = self.get_relative_risk_data(builder).set_index(index_columns)
-        exposure_data = self.get_exposure_data(builder).set_index(index_columns)
-        mean_rr = (rr_data * exposure_data).sum(axis=1)
-        paf_data = ((mean_rr - 1)/mean_rr).reset_index().rename(columns={0: 'value'})
-        return paf_data
+        return self.exposure_effect(target, index)
 
     def get_exposure_effect(self, builder):
-        risk_exposure = builder.value.get_value(f'{self.risk.name}.exposure')
+        risk_exposure = builder.components.get_components_by_type(LBWSGRisk)[0].get_current_exposure
 
-        def exposure_effect(rates, rr):
-            exposure = risk_exposure(rr.index)
-            return rates * (rr.lookup(exposure.index, exposure))
+        def exposure_effect(rates, index):
+            exposure = risk_exposure(index)
+            return rates * self.relative_risk(index, exposure)
 
         return exposure_effect
 
-    @staticmethod
-    def get_exposure_data(builder):
-        exposure = read_data_by_draw(builder, project_globals.LBWSG_EXPOSURE)
-        exposure = pivot_categorical(exposure)
-        exposure[project_globals.LBWSG_MISSING_CATEGORY.CAT] = project_globals.LBWSG_MISSING_CATEGORY.EXPOSURE
-        return exposure
+
+class LBWSGRelativeRisk:
+    """Relative risk table that gathers a single value per simulant.
+
+    A lookup table built on the wide relative risk data produces one column
+    per LBWSG category for every simulant, all but one of which are then
+    discarded.  Instead, this interpolates the position of each simulant's
+    row in the relative risk data and gathers the value for the simulant's
+    category directly from the underlying array.
+
+    Row positions are recovered exactly because the model uses order 0
+    interpolation.
+    """
+
+    index_columns = ['sex', 'age_start', 'age_end', 'year_start', 'year_end']
+
+    def __init__(self, builder, relative_risk_data: pd.DataFrame):
+        relative_risk_data = relative_risk_data.reset_index(drop=True)
+        self.categories = relative_risk_data.columns.drop(self.index_columns)
+        self.values = relative_risk_data[self.categories].values
+        row_data = relative_risk_data[self.index_columns].assign(value=np.arange(len(relative_risk_data),
+                                                                                 dtype=float))
+        self._row = builder.lookup.build_table(row_data, key_columns=['sex'], parameter_columns=['age', 'year'])
+
+    def __call__(self, index: pd.Index, category: pd.Series) -> np.ndarray:
+        rows = self._row(index).values.astype(np.int64)
+        columns = self.categories.get_indexer(category.cat.categories)[category.cat.codes.values]
+        return self.values[rows, columns]
 
 
 def read_data_by_draw(builder, key):
     path = builder.configuration.input_data.artifact_path
     draw = builder.configuration.input_data.input_draw_number
-    key = key.replace(".", "/")
-    with pd.HDFStore(path, mode='r') as store:
-        index = store.get(f'{key}/index')
-        draw = store.get(f'{key}/draw_{draw}')
-    draw = draw.rename("value")
-    data = pd.concat([index, draw], axis=1)
-    data = data.drop(columns='location')
-    return data
+    return artifact_cache.read_data_by_draw(path, key, draw)
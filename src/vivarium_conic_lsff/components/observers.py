@@ -1,21 +1,18 @@
-from collections import Counter
 import itertools
 import typing
-from typing import Dict, Iterable, List, Tuple, Union
+from typing import Dict, Iterable, List, Tuple
 
 import pandas as pd
 import numpy as np
-from vivarium_public_health.metrics.disability import get_years_lived_with_disability
 from vivarium_public_health.disease import DiseaseState, RiskAttributableDisease
 from vivarium_public_health.metrics import (MortalityObserver as MortalityObserver_,
                                             DisabilityObserver as DisabilityObserver_)
-from vivarium_public_health.metrics.utilities import (get_output_template, get_group_counts,
-                                                      QueryString, to_years,
-                                                      get_deaths, get_years_of_life_lost,
-                                                      get_age_bins, get_time_iterable)
+from vivarium_public_health.metrics.utilities import (get_output_template, to_years, get_deaths,
+                                                      get_years_of_life_lost, get_age_bins)
 
 from vivarium_conic_lsff import globals as project_globals
 from vivarium_conic_lsff.components import VitaminADeficiency, IronDeficiency
+from vivarium_conic_lsff.utilities import MeanVarianceAccumulator, StepCache, get_codes, to_categorical
 
 if typing.TYPE_CHECKING:
     from vivarium.framework.engine import Builder
@@ -31,10 +28,25 @@ class ResultsStratifier:
     results production and have this component manage adjustments to the
     final column labels for the subgroups.
 
+    Each simulant is assigned a single integer stratum code indexing
+    :attr:`ResultsStratifier.labels`, so observers can aggregate over all
+    strata in one pass with :meth:`ResultsStratifier.count` instead of
+    filtering the population once per stratum.
+
+    Stratum codes depend only on the simulant and not on the observer, so
+    the first stratifier set up in the simulation computes them and all
+    others share its cache.  The cache is dropped at the start of every
+    event, and its hit and miss counts are reported with the metrics.
+
     """
+    # Events after which stratum codes may have changed.
+    invalidating_events = ['time_step__prepare', 'time_step', 'time_step__cleanup',
+                           'collect_metrics', 'simulation_end']
 
     def __init__(self, observer_name: str):
         self.name = f'{observer_name}_results_stratifier'
+        self.labels = list(itertools.product(project_globals.FOLIC_ACID_FORTIFICATION_GROUPS,
+                                             project_globals.VITAMIN_A_FORTIFICATION_GROUPS))
 
     def setup(self, builder: 'Builder'):
         """Perform this component's setup."""
@@ -48,6 +60,50 @@ class ResultsStratifier:
         ])
         self.vitamin_a_coverage = builder.value.get_value('vitamin_a_fortification.effectively_covered')
 
+        shared = builder.components.get_components_by_type(ResultsStratifier)[0]
+        if shared is self:
+            self.strata_cache = StepCache(builder.time.clock(), self._compute_strata)
+            for event in self.invalidating_events:
+                builder.event.register_listener(event, self.on_event, priority=0)
+            builder.value.register_value_modifier('metrics', self.metrics)
+        else:
+            self.strata_cache = shared.strata_cache
+
+    def on_event(self, event: 'Event'):
+        self.strata_cache.invalidate()
+
+    def metrics(self, index: pd.Index, metrics: Dict[str, float]) -> Dict[str, float]:
+        metrics['results_stratification_cache_hits'] = self.strata_cache.hits
+        metrics['results_stratification_cache_misses'] = self.strata_cache.misses
+        return metrics
+
+    def get_strata(self, population: pd.DataFrame) -> np.ndarray:
+        """Assigns each simulant in the population the code of its stratum.
+
+        Parameters
+        ----------
+        population
+            The population to stratify.
+
+        Returns
+        -------
+            An integer array aligned with the population whose values
+            index :attr:`ResultsStratifier.labels`.
+
+        """
+        if population.empty:
+            return np.zeros(0, dtype=np.int64)
+        return self.strata_cache(population.index).values
+
+    def _compute_strata(self, index: pd.Index) -> pd.Series:
+        pop = self.population_view.get(index)
+        folic_acid_covered = self.folic_acid_covered(pop)
+        vitamin_a_covered = self.vitamin_a_covered(pop)
+        n_vitamin_a_groups = len(project_globals.VITAMIN_A_FORTIFICATION_GROUPS)
+        strata = (folic_acid_covered.cat.codes.values.astype(np.int64) * n_vitamin_a_groups
+                  + vitamin_a_covered.cat.codes.values)
+        return pd.Series(strata, index=index)
+
     def group(self, population: pd.DataFrame) -> Iterable[Tuple[Tuple[str, ...], pd.DataFrame]]:
         """Takes the full population and yields stratified subgroups.
 
@@ -62,18 +118,40 @@ class ResultsStratifier:
             corresponding to those labels.
 
         """
-        folic_acid_covered = self.folic_acid_covered(population)
-        vitamin_a_covered = self.vitamin_a_covered(population)
-
-        groups = itertools.product(project_globals.FOLIC_ACID_FORTIFICATION_GROUPS,
-                                   project_globals.VITAMIN_A_FORTIFICATION_GROUPS)
-        for folic_acid_group, vitamin_a_group in groups:
-            if population.empty:
-                pop_in_group = population
-            else:
-                pop_in_group = population.loc[(folic_acid_covered == folic_acid_group)
-                                              & (vitamin_a_covered == vitamin_a_group)]
-            yield (folic_acid_group, vitamin_a_group), pop_in_group
+        if population.empty:
+            subgroups = {}
+        else:
+            subgroups = dict(list(population.groupby(self.get_strata(population))))
+        for code, labels in enumerate(self.labels):
+            yield labels, subgroups.get(code, population.iloc[:0])
+
+    def count(self, strata: np.ndarray, group_codes: np.ndarray, n_groups: int,
+              weights: np.ndarray = None) -> np.ndarray:
+        """Counts, or sums weights, by stratum and by an observer's own group.
+
+        Parameters
+        ----------
+        strata
+            Stratum codes from :meth:`ResultsStratifier.get_strata`.
+        group_codes
+            Codes in ``[0, n_groups)`` for any further grouping done by the
+            observer (e.g. age and sex groups), with -1 marking simulants
+            that should not be counted.
+        n_groups
+            The number of observer groups.
+        weights
+            Optional per-simulant values to sum instead of counting.
+
+        Returns
+        -------
+            An array of shape ``(len(labels), n_groups)``.
+
+        """
+        counted = group_codes >= 0
+        codes = strata[counted] * n_groups + group_codes[counted]
+        weights = weights[counted] if weights is not None else None
+        counts = np.bincount(codes, weights, minlength=len(self.labels) * n_groups)
+        return counts.reshape(len(self.labels), n_groups)
 
     @staticmethod
     def update_labels(measure_data: Dict[str, float], labels: Tuple[str, ...]) -> Dict[str, float]:
@@ -99,27 +177,243 @@ class ResultsStratifier:
                         for k, v in measure_data.items()}
         return measure_data
 
-    def folic_acid_covered(self, population: pd.DataFrame) -> pd.Series:
-        pop = self.population_view.get(population.index)
+    @staticmethod
+    def folic_acid_covered(pop: pd.DataFrame) -> pd.Series:
         return pop[project_globals.FOLIC_ACID_FORTIFICATION_COVERAGE_COLUMN]
 
-    def vitamin_a_covered(self, population: pd.DataFrame) -> pd.Series:
-        pop = self.population_view.get(population.index)
-        raw_coverage = self.vitamin_a_coverage(population.index).map({'cat1': 'uncovered',
-                                                                      'cat2': 'effectively_covered'})
-        started = ~pop[project_globals.VITAMIN_A_COVERAGE_START_COLUMN].isnull()
-        underage = pop.age <= 0.5
-        uncovered = (raw_coverage == 'uncovered') & ~started
-        covered = (
-                ((raw_coverage == 'uncovered') & started)
-                | ((raw_coverage == 'effectively_covered') & underage)
-        )
-        effectively_covered = (raw_coverage == 'effectively_covered') & ~underage
+    def vitamin_a_covered(self, pop: pd.DataFrame) -> pd.Series:
+        exposure_dtype = project_globals.CATEGORY_DTYPES.VITAMIN_A_EXPOSURE
+        coverage_dtype = project_globals.CATEGORY_DTYPES.VITAMIN_A_FORTIFICATION_COVERAGE
+        raw_coverage = self.vitamin_a_coverage(pop.index)
+        raw_effectively_covered = raw_coverage.cat.codes.values == get_codes(exposure_dtype, ['cat2'])[0]
+        started = pop[project_globals.VITAMIN_A_COVERAGE_START_COLUMN].notnull().values
+        underage = (pop.age <= 0.5).values
+
+        uncovered, covered, effectively_covered = get_codes(coverage_dtype,
+                                                            ['uncovered', 'covered', 'effectively_covered'])
+        coverage = np.select([raw_effectively_covered & ~underage, raw_effectively_covered | started],
+                             [effectively_covered, covered], uncovered)
+        return to_categorical(coverage, coverage_dtype, pop.index)
+
+
+def get_age_sex_group_labels(config: Dict[str, bool], age_bins: pd.DataFrame) -> List[Dict[str, str]]:
+    """Gets the output template substitutions for each age and sex group
+    code assigned by :func:`get_age_sex_groups`."""
+    age_groups = list(age_bins.sort_values('age_start').age_group_name) if config['by_age'] else ['all_ages']
+    sexes = ['Male', 'Female'] if config['by_sex'] else ['Both']
+    return [{'age_group': age_group, 'sex': sex} for age_group in age_groups for sex in sexes]
+
+
+def get_age_sex_groups(pop: pd.DataFrame, config: Dict[str, bool],
+                       age_bins: pd.DataFrame) -> Tuple[np.ndarray, List[Dict[str, str]]]:
+    """Assigns each simulant a code for its age and sex group.
+
+    The groups match those used by
+    :func:`vivarium_public_health.metrics.utilities.get_group_counts`.
+
+    Parameters
+    ----------
+    pop
+        The population to group.
+    config
+        A dict with ``by_age`` and ``by_sex`` keys and boolean values.
+    age_bins
+        A dataframe with ``age_group_name``, ``age_start`` and ``age_end``
+        columns.
+
+    Returns
+    -------
+    group_codes
+        The group code of each simulant, or -1 for simulants outside every
+        age group.
+    groups
+        The output template substitutions for each group code.
 
-        raw_coverage.loc[uncovered] = 'uncovered'
-        raw_coverage.loc[covered] = 'covered'
-        raw_coverage.loc[effectively_covered] = 'effectively_covered'
-        return raw_coverage
+    """
+    if config['by_age']:
+        age_bins = age_bins.sort_values('age_start')
+        age = pop.age.values
+        age_group = np.searchsorted(age_bins.age_start.values, age, side='right') - 1
+        in_age_group = (age_group >= 0) & (age < age_bins.age_end.values[np.maximum(age_group, 0)])
+        age_group = np.where(in_age_group, age_group, -1)
+    else:
+        age_group = np.zeros(len(pop), dtype=np.int64)
+
+    if config['by_sex']:
+        n_sexes = 2
+        sex = pd.Categorical(pop.sex, categories=['Male', 'Female']).codes.astype(np.int64)
+    else:
+        n_sexes = 1
+        sex = np.zeros(len(pop), dtype=np.int64)
+
+    group_codes = np.where((age_group >= 0) & (sex >= 0), age_group * n_sexes + sex, -1)
+    return group_codes, get_age_sex_group_labels(config, age_bins)
+
+
+class ObservationTensor:
+    """Accumulates stratified counts and sums in a preallocated array.
+
+    The array has the named axes ``measure``, ``year``, ``folic_acid``,
+    ``vitamin_a``, ``age_group`` and ``sex``, without the fortification axes
+    if no stratifier is provided.  Measures carry their cause or
+    state (e.g. ``ylds_due_to_measles``) as in the output column names.
+    Observers add to it from integer codes during the simulation and the
+    output keys are only formatted when :meth:`ObservationTensor.to_dict`
+    is called to produce metrics.
+
+    Parameters
+    ----------
+    measures
+        The measures to observe.
+    config
+        A dict with ``by_age``, ``by_sex``, and ``by_year`` keys and
+        boolean values.
+    years
+        The years to observe.  Ignored if not observing by year.
+    age_bins
+        A dataframe with ``age_group_name`` and ``age_start`` columns.
+    stratifier
+        The stratifier that produces the stratum codes to add with, if
+        the observations are stratified.
+
+    """
+
+    def __init__(self, measures: List[str], config: Dict[str, bool], years: List[int],
+                 age_bins: pd.DataFrame, stratifier: ResultsStratifier = None):
+        self.template = get_output_template(**config)
+        self.by_year = config['by_year']
+        self.stratifier = stratifier
+        self.stratum_labels = stratifier.labels if stratifier is not None else [None]
+        years = list(years) if self.by_year else ['all_years']
+        self.groups = get_age_sex_group_labels(config, age_bins)
+        self.axes = {'measure': list(measures), 'year': years}
+        if stratifier is not None:
+            self.axes['folic_acid'] = list(project_globals.FOLIC_ACID_FORTIFICATION_GROUPS)
+            self.axes['vitamin_a'] = list(project_globals.VITAMIN_A_FORTIFICATION_GROUPS)
+        self.axes['age_group'] = list(dict.fromkeys(group['age_group'] for group in self.groups))
+        self.axes['sex'] = list(dict.fromkeys(group['sex'] for group in self.groups))
+        self._measure_index = {measure: i for i, measure in enumerate(measures)}
+        self._year_index = {year: i for i, year in enumerate(years)}
+        self.values = np.zeros([len(labels) for labels in self.axes.values()])
+        # Only years the simulation has reached are reported.
+        self.observed_years = np.zeros(len(years), dtype=bool)
+
+    @classmethod
+    def from_builder(cls, builder: 'Builder', measures: List[str], config: Dict[str, bool],
+                     stratifier: ResultsStratifier = None) -> 'ObservationTensor':
+        """Builds a tensor for the simulation years and age bins."""
+        years = range(builder.configuration.time.start.year, builder.configuration.time.end.year + 1)
+        return cls(measures, config, years, get_age_bins(builder), stratifier)
+
+    def add(self, measure: str, year: int, strata: np.ndarray, group_codes: np.ndarray,
+            weights: np.ndarray = None):
+        """Counts, or sums weights, for a measure in a year.
+
+        Parameters
+        ----------
+        measure
+            The measure to add to.
+        year
+            The year to add to.  Ignored if not observing by year.
+        strata
+            Stratum codes from :meth:`ResultsStratifier.get_strata`, or
+            None if the observations are not stratified.
+        group_codes
+            Age and sex group codes from :func:`get_age_sex_groups`.
+        weights
+            Optional per-simulant values to sum instead of counting.
+
+        """
+        measure_codes = np.zeros(len(group_codes), dtype=np.int64)
+        self.add_by_measure([measure], measure_codes, year, strata, group_codes, weights)
+
+    def add_by_measure(self, measures: List[str], measure_codes: np.ndarray, year: int,
+                       strata: np.ndarray, group_codes: np.ndarray, weights: np.ndarray = None):
+        """Counts, or sums weights, for several measures in a single pass.
+
+        Parameters
+        ----------
+        measures
+            The measures to add to.
+        measure_codes
+            The index in ``measures`` each simulant counts towards, or -1 for
+            simulants that should not be counted.
+        year
+            The year to add to.  Ignored if not observing by year.
+        strata
+            Stratum codes from :meth:`ResultsStratifier.get_strata`, or
+            None if the observations are not stratified.
+        group_codes
+            Age and sex group codes from :func:`get_age_sex_groups`.
+        weights
+            Optional per-simulant values to sum instead of counting.
+
+        """
+        y = self._year_index[year] if self.by_year else 0
+        n_groups = len(self.groups)
+        n_codes = len(measures) * n_groups
+        codes = np.where((measure_codes >= 0) & (group_codes >= 0), measure_codes * n_groups + group_codes, -1)
+        if self.stratifier is not None:
+            counts = self.stratifier.count(strata, codes, n_codes, weights)
+        else:
+            counted = codes >= 0
+            weights = weights[counted] if weights is not None else None
+            counts = np.bincount(codes[counted], weights, minlength=n_codes)
+        counts = counts.reshape(len(self.stratum_labels), len(measures), n_groups).swapaxes(0, 1)
+        measure_index = [self._measure_index[measure] for measure in measures]
+        self.values[measure_index, y] += counts.reshape((len(measures),) + self.values.shape[2:])
+        self.observed_years[y] = True
+
+    def to_dict(self) -> Dict[str, float]:
+        """Flattens the observations to output keys and values."""
+        results = {}
+        for m, measure in enumerate(self.axes['measure']):
+            for y in np.flatnonzero(self.observed_years):
+                base_key = self.template.substitute(measure=measure, year=self.axes['year'][y])
+                stratum_values = self.values[m, y].reshape(len(self.stratum_labels), len(self.groups))
+                for labels, values in zip(self.stratum_labels, stratum_values):
+                    stratum_results = {base_key.substitute(**group): value for group, value in zip(self.groups, values)}
+                    if labels is not None:
+                        stratum_results = self.stratifier.update_labels(stratum_results, labels)
+                    results.update(stratum_results)
+        return results
+
+
+def get_observation_weight(time: pd.Timestamp, step_size: pd.Timedelta, sim_start: pd.Timestamp,
+                           sim_end: pd.Timestamp, interval: int) -> pd.Timedelta:
+    """Gets the simulation time an observation made on a time step stands for.
+
+    Observers configured with an ``observation_interval`` of ``n`` observe on
+    the first time step and then every ``n`` steps.  Each observation stands
+    for the time steps up to the next one, so person time accumulated this
+    way is the same in expectation as observing every step.  The interval
+    should stay short next to the narrowest age group observed and to the
+    time it takes prevalence to settle after the simulation starts.
+
+    Parameters
+    ----------
+    time
+        The start of the current time step.
+    step_size
+        The size of a time step.
+    sim_start
+        The time the simulation starts.
+    sim_end
+        The time the simulation ends.
+    interval
+        The number of time steps between observations.
+
+    Returns
+    -------
+        The time the observation stands for, or zero if no observation
+        should be made on this time step.
+
+    """
+    step = int(round((time - sim_start) / step_size))
+    if step % interval:
+        return pd.Timedelta(0)
+    n_steps = int(np.ceil((sim_end - sim_start) / step_size))
+    return min(interval, n_steps - step) * step_size
 
 
 class MortalityObserver():
@@ -130,6 +424,7 @@ class MortalityObserver():
                 'by_age': False,
                 'by_year': False,
                 'by_sex': False,
+                'observation_interval': 1,
             }
         }
     }
@@ -143,7 +438,6 @@ class MortalityObserver():
         return [self.stratifier]
 
     def __init__(self):
-        self.person_time = Counter()
         self.stratifier = ResultsStratifier(self.name)
 
     def setup(self, builder):
@@ -151,8 +445,11 @@ class MortalityObserver():
         self.clock = builder.time.clock()
         self.step_size = builder.time.step_size()
         self.start_time = self.clock()
+        self.end_time = pd.Timestamp(**builder.configuration.time.end.to_dict())
         self.initial_pop_entrance_time = self.start_time - self.step_size()
         self.age_bins = get_age_bins(builder)
+        self.person_time = ObservationTensor.from_builder(builder, ['person_time'], self.config.to_dict(),
+                                                          self.stratifier)
         diseases = builder.components.get_components_by_type((DiseaseState, RiskAttributableDisease))
         self.causes = [c.state_id for c in diseases] + ['other_causes']
 
@@ -169,13 +466,15 @@ class MortalityObserver():
         builder.value.register_value_modifier('metrics', self.metrics)
 
     def on_time_step_prepare(self, event: 'Event'):
-        pop = self.population_view.get(event.index)
-        for labels, pop_in_group in self.stratifier.group(pop):
-            base_args = (pop_in_group, self.config.to_dict(),
-                         self.clock().year, event.step_size, self.age_bins)
-            person_time = get_person_time(*base_args)
-            person_time = self.stratifier.update_labels(person_time, labels)
-            self.person_time.update(person_time)
+        weight = get_observation_weight(self.clock(), event.step_size, self.start_time, self.end_time,
+                                        self.config.observation_interval)
+        if not weight:
+            return
+        pop = self.population_view.get(event.index, query='alive == "alive"')
+        strata = self.stratifier.get_strata(pop)
+        group_codes, _ = get_age_sex_groups(pop, self.config.to_dict(), self.age_bins)
+        person_time = np.full(len(pop), to_years(weight))
+        self.person_time.add('person_time', self.clock().year, strata, group_codes, weights=person_time)
 
     def metrics(self, index, metrics):
         pop = self.population_view.get(index)
@@ -199,23 +498,20 @@ class MortalityObserver():
         metrics[project_globals.TOTAL_YLLS_COLUMN] = self.life_expectancy(the_dead.index).sum()
         metrics['total_population_living'] = len(the_living)
         metrics['total_population_dead'] = len(the_dead)
-        metrics.update(self.person_time)
+        metrics.update(self.person_time.to_dict())
 
         return metrics
 
 
-def get_person_time(pop: pd.DataFrame, config: Dict[str, bool],
-                    current_year: Union[str, int], step_size: pd.Timedelta,
-                    age_bins: pd.DataFrame) -> Dict[str, float]:
-    base_key = get_output_template(**config).substitute(measure='person_time',
-                                                        year=current_year)
-    base_filter = QueryString(f'alive == "alive"')
-    person_time = get_group_counts(pop, base_filter, base_key, config, age_bins,
-                                   aggregate=lambda x: len(x) * to_years(step_size))
-    return person_time
-
-
 class DisabilityObserver(DisabilityObserver_):
+    configuration_defaults = {
+        'metrics': {
+            'disability': {
+                **DisabilityObserver_.configuration_defaults['metrics']['disability'],
+                'observation_interval': 1,
+            }
+        }
+    }
 
     def __init__(self):
         super().__init__()
@@ -235,22 +531,37 @@ class DisabilityObserver(DisabilityObserver_):
 
         self.disability_weight_pipelines = {cause: builder.value.get_value(f'{cause}.disability_weight')
                                             for cause in self.causes}
+        measures = [f'ylds_due_to_{cause}' for cause in self.causes]
+        self.years_lived_with_disability = ObservationTensor.from_builder(builder, measures, self.config.to_dict(),
+                                                                          self.stratifier)
+        self.start_time = self.clock()
+        self.end_time = pd.Timestamp(**builder.configuration.time.end.to_dict())
 
     def on_time_step_prepare(self, event: 'Event'):
+        weight = get_observation_weight(self.clock(), event.step_size, self.start_time, self.end_time,
+                                        self.config.observation_interval)
+        if not weight:
+            return
         pop = self.population_view.get(event.index, query='tracked == True and alive == "alive"')
-        self.update_metrics(pop)
+        self.update_metrics(pop, weight)
 
-        pop.loc[:, project_globals.TOTAL_YLDS_COLUMN] += self.disability_weight(pop.index)
+        # The disability weight pipeline is rescaled to a single time step.
+        pop.loc[:, project_globals.TOTAL_YLDS_COLUMN] += self.disability_weight(pop.index) * (weight / event.step_size)
         self.population_view.update(pop)
 
-    def update_metrics(self, pop: pd.DataFrame):
-        for labels, pop_in_group in self.stratifier.group(pop):
-            ylds_this_step = get_years_lived_with_disability(pop_in_group, self.config.to_dict(),
-                                                             self.clock().year, self.step_size(),
-                                                             self.age_bins, self.disability_weight_pipelines,
-                                                             self.causes)
-            ylds_this_step = self.stratifier.update_labels(ylds_this_step, labels)
-            self.years_lived_with_disability.update(ylds_this_step)
+    def update_metrics(self, pop: pd.DataFrame, weight: pd.Timedelta):
+        strata = self.stratifier.get_strata(pop)
+        group_codes, _ = get_age_sex_groups(pop, self.config.to_dict(), self.age_bins)
+        for cause in self.causes:
+            ylds = self.disability_weight_pipelines[cause](pop.index).values * to_years(weight)
+            self.years_lived_with_disability.add(f'ylds_due_to_{cause}', self.clock().year,
+                                                 strata, group_codes, weights=ylds)
+
+    def metrics(self, index: pd.Index, metrics: Dict[str, float]) -> Dict[str, float]:
+        total_ylds = self.population_view.get(index)[project_globals.TOTAL_YLDS_COLUMN].sum()
+        metrics[project_globals.TOTAL_YLDS_COLUMN] = total_ylds
+        metrics.update(self.years_lived_with_disability.to_dict())
+        return metrics
 
 
 class DiseaseObserver:
@@ -261,6 +572,7 @@ class DiseaseObserver:
                 'by_age': False,
                 'by_year': False,
                 'by_sex': False,
+                'observation_interval': 1,
             }
         }
     }
@@ -284,11 +596,15 @@ class DiseaseObserver:
         self.config = builder.configuration['metrics'][f'{self.disease}_observer'].to_dict()
         self.clock = builder.time.clock()
         self.age_bins = get_age_bins(builder)
-        self.counts = Counter()
-        self.person_time = Counter()
 
         self.states = project_globals.DISEASE_MODEL_MAP[self.disease]['states']
         self.transitions = project_globals.DISEASE_MODEL_MAP[self.disease]['transitions']
+        measures = ([f'{transition}_event_count' for transition in self.transitions]
+                    + [f'{state}_person_time' for state in self.states])
+        self.observations = ObservationTensor.from_builder(builder, measures, self.config, self.stratifier)
+        self.transition_lookup = get_transition_lookup(self.states, self.transitions)
+        self.start_time = self.clock()
+        self.end_time = pd.Timestamp(**builder.configuration.time.end.to_dict())
 
         self.previous_state_column = f'previous_{self.disease}'
         builder.population.initializes_simulants(self.on_initialize_simulants,
@@ -313,69 +629,76 @@ class DiseaseObserver:
 
     def on_time_step_prepare(self, event: 'Event'):
         pop = self.population_view.get(event.index)
-        # Ignoring the edge case where the step spans a new year.
-        # Accrue all counts and time to the current year.
-        for labels, pop_in_group in self.stratifier.group(pop):
-            for state in self.states:
-                # noinspection PyTypeChecker
-                state_person_time_this_step = get_state_person_time(pop_in_group, self.config, self.disease, state,
-                                                                    self.clock().year, event.step_size, self.age_bins)
-                state_person_time_this_step = self.stratifier.update_labels(state_person_time_this_step, labels)
-                self.person_time.update(state_person_time_this_step)
-
-        # This enables tracking of transitions between states
-        prior_state_pop = self.population_view.get(event.index)
-        prior_state_pop[self.previous_state_column] = prior_state_pop[self.disease]
-        self.population_view.update(prior_state_pop)
+        weight = get_observation_weight(self.clock(), event.step_size, self.start_time, self.end_time,
+                                        self.config['observation_interval'])
+        if weight:
+            strata = self.stratifier.get_strata(pop)
+            group_codes, _ = get_age_sex_groups(pop, self.config, self.age_bins)
+            state_codes = get_state_codes(pop[self.disease], self.states)
+            state_codes[(pop.alive != 'alive').values] = -1
+            person_time = np.full(len(pop), to_years(weight))
+            # Ignoring the edge case where the observation spans a new year.
+            # Accrue all counts and time to the current year.
+            self.observations.add_by_measure([f'{state}_person_time' for state in self.states], state_codes,
+                                             self.clock().year, strata, group_codes, weights=person_time)
+
+        # This enables tracking of transitions between states, which are
+        # counted on every time step.
+        self.population_view.update(pop[self.disease].rename(self.previous_state_column))
 
     def on_collect_metrics(self, event: 'Event'):
         pop = self.population_view.get(event.index)
-        for labels, pop_in_group in self.stratifier.group(pop):
-            for transition in self.transitions:
-                # noinspection PyTypeChecker
-                transition_counts_this_step = get_transition_count(pop_in_group, self.config, self.disease, transition,
-                                                                   event.time, self.age_bins)
-                transition_counts_this_step = self.stratifier.update_labels(transition_counts_this_step, labels)
-                self.counts.update(transition_counts_this_step)
+        strata = self.stratifier.get_strata(pop)
+        group_codes, _ = get_age_sex_groups(pop, self.config, self.age_bins)
+        transition_codes = get_transition_codes(pop[self.previous_state_column], pop[self.disease],
+                                                self.states, self.transition_lookup)
+        self.observations.add_by_measure([f'{transition}_event_count' for transition in self.transitions],
+                                         transition_codes, event.time.year, strata, group_codes)
 
     def metrics(self, index: pd.Index, metrics: Dict[str, float]):
-        metrics.update(self.counts)
-        metrics.update(self.person_time)
+        metrics.update(self.observations.to_dict())
         return metrics
 
     def __repr__(self) -> str:
         return f"DiseaseObserver({self.disease})"
 
 
-def get_state_person_time(pop: pd.DataFrame, config: Dict[str, bool],
-                          disease: str, state: str, current_year: Union[str, int],
-                          step_size: pd.Timedelta, age_bins: pd.DataFrame) -> Dict[str, float]:
-    """Custom person time getter that handles state column name assumptions"""
-    base_key = get_output_template(**config).substitute(measure=f'{state}_person_time',
-                                                        year=current_year)
-    base_filter = QueryString(f'alive == "alive" and {disease} == "{state}"')
-    person_time = get_group_counts(pop, base_filter, base_key, config, age_bins,
-                                   aggregate=lambda x: len(x) * to_years(step_size))
-    return person_time
-
-
-def get_transition_count(pop: pd.DataFrame, config: Dict[str, bool],
-                         disease: str, transition: project_globals.TransitionString,
-                         event_time: pd.Timestamp, age_bins: pd.DataFrame) -> Dict[str, float]:
-    """Counts transitions that occurred this step."""
-    event_this_step = ((pop[f'previous_{disease}'] == transition.from_state)
-                       & (pop[disease] == transition.to_state))
-    transitioned_pop = pop.loc[event_this_step]
-    base_key = get_output_template(**config).substitute(measure=f'{transition}_event_count',
-                                                        year=event_time.year)
-    base_filter = QueryString('')
-    transition_count = get_group_counts(transitioned_pop, base_filter, base_key, config, age_bins)
-    return transition_count
+def get_state_codes(state: pd.Series, states: List[str]) -> np.ndarray:
+    """Gets the index in ``states`` of each simulant's state, or -1 for
+    simulants in none of them (e.g. simulants that have not had a previous
+    state yet)."""
+    return pd.Categorical(state, categories=states).codes.astype(np.int64)
+
+
+def get_transition_lookup(states: List[str],
+                          transitions: List[project_globals.TransitionString]) -> np.ndarray:
+    """Builds a table from (previous, current) state code pairs to the index
+    of the transition between them in ``transitions``, or -1 where there is
+    none."""
+    lookup = np.full((len(states), len(states)), -1, dtype=np.int64)
+    for i, transition in enumerate(transitions):
+        lookup[states.index(transition.from_state), states.index(transition.to_state)] = i
+    return lookup
+
+
+def get_transition_codes(previous_state: pd.Series, state: pd.Series, states: List[str],
+                         transition_lookup: np.ndarray) -> np.ndarray:
+    """Gets the index of the transition each simulant made this step, or -1
+    for simulants that did not transition."""
+    previous_codes = get_state_codes(previous_state, states)
+    current_codes = get_state_codes(state, states)
+    codes = transition_lookup[previous_codes, current_codes]
+    codes[(previous_codes < 0) | (current_codes < 0)] = -1
+    return codes
 
 
 class LiveBirthWithNTDObserver:
     """Observes births and births with neural tube defects. Output can be stratified
     by year and by sex.
+
+    Births are counted as simulants are created, in the stratum they are
+    born into, so producing the metrics does not require reading the
+    population table.
     """
     configuration_defaults = {
         'metrics': {
@@ -404,72 +727,48 @@ class LiveBirthWithNTDObserver:
 
         self._sim_start = pd.Timestamp(**builder.configuration.time.start.to_dict())
         self._sim_end = pd.Timestamp(**builder.configuration.time.end.to_dict())
-
-        columns_required = ['alive', f'{self.disease}', 'entrance_time', 'tracked']
+        years = range(self._sim_start.year, self._sim_end.year + 1)
+        self.births = ObservationTensor(['live_births', 'born_with_ntds'], self.config, years,
+                                        pd.DataFrame(), self.stratifier)
+        # Births are reported for every simulation year, including years
+        # nobody is born in.
+        self.births.observed_years[:] = True
+
+        columns_required = [f'{self.disease}']
         if self.config['by_sex']:
             columns_required.append('sex')
-
-        self.population_view = builder.population.get_view(columns_required)
+        self.population_view = builder.population.get_view(columns_required + ['tracked'])
+        stratification_columns = [project_globals.FOLIC_ACID_FORTIFICATION_COVERAGE_COLUMN,
+                                  project_globals.VITAMIN_A_COVERAGE_START_COLUMN, 'age']
+        builder.population.initializes_simulants(self.on_initialize_simulants,
+                                                 requires_columns=columns_required + stratification_columns,
+                                                 requires_values=['vitamin_a_fortification.effectively_covered'])
         builder.value.register_value_modifier('metrics', self.metrics)
 
+    def on_initialize_simulants(self, pop_data: 'SimulantData'):
+        if not self._sim_start <= pop_data.creation_time < self._sim_end:
+            return
+        pop = self.population_view.get(pop_data.index)
+        strata = self.stratifier.get_strata(pop)
+        group_codes, _ = get_age_sex_groups(pop, self.config, pd.DataFrame())
+        year = pop_data.creation_time.year
+        self.births.add('live_births', year, strata, group_codes)
+        with_ntds = (pop[self.disease] == project_globals.NTD_WITH_CONDITION_STATE_NAME).values
+        self.births.add('born_with_ntds', year, strata[with_ntds], group_codes[with_ntds])
+
     def metrics(self, index, metrics):
-        pop = self.population_view.get(index)
-        for labels, pop_in_group in self.stratifier.group(pop):
-            births = get_births(pop_in_group, self.config, self._sim_start, self._sim_end)
-            births = self.stratifier.update_labels(births, labels)
-            metrics.update(births)
+        metrics.update(self.births.to_dict())
         return metrics
 
     def __repr__(self):
         return f"DiseaseObserver({self.disease})"
 
 
-def get_births(pop: pd.DataFrame, config: Dict[str, bool], sim_start: pd.Timestamp,
-               sim_end: pd.Timestamp) -> Dict[str, int]:
-    """Counts the number of births and births with neural tube defects prevelant.
-    Parameters
-    ----------
-    pop
-        The population dataframe to be counted. It must contain sufficient
-        columns for any necessary filtering (e.g. the ``age`` column if
-        filtering by age).
-    config
-        A dict with ``by_age``, ``by_sex``, and ``by_year`` keys and
-        boolean values.
-    sim_start
-        The simulation start time.
-    sim_end
-        The simulation end time.
-    Returns
-    -------
-    births
-        All births and births with neural tube defects present.
-    """
-    base_filter = QueryString('')
-    base_key = get_output_template(**config)
-    time_spans = get_time_iterable(config, sim_start, sim_end)
-
-    births = {}
-    for year, (t_start, t_end) in time_spans:
-        start = max(sim_start, t_start)
-        end = min(sim_end, t_end)
-        born_in_span = pop.query(f'"{start}" <= entrance_time and entrance_time < "{end}"')
-
-        cat_year_key = base_key.substitute(measure='live_births', year=year)
-        group_births = get_group_counts(born_in_span, base_filter, cat_year_key, config, pd.DataFrame())
-        births.update(group_births)
-
-        cat_year_key = base_key.substitute(measure='born_with_ntds', year=year)
-        filter_update = f'{project_globals.NTD_MODEL_NAME} == "{project_globals.NTD_MODEL_NAME}"'
-        empty_age_bins = pd.DataFrame()
-        group_ntd_births = get_group_counts(born_in_span, base_filter + filter_update,
-                                            cat_year_key, config, empty_age_bins)
-        births.update(group_ntd_births)
-    return births
-
-
 class BirthweightObserver:
-    """Observes birth_weights and stratifies by sex, year, and treatment group
+    """Observes birth_weights and stratifies by sex, year, and treatment group.
+
+    Birth weights are summarized as simulants are born, so producing the
+    metrics does not require reading the population table.
     """
     configuration_defaults = {
         'metrics': {
@@ -486,16 +785,41 @@ class BirthweightObserver:
 
     def setup(self, builder):
         self.disease = project_globals.BIRTH_WEIGHT
+        self.iron_groups = ['covered', 'uncovered']
+        self.strata = list(itertools.product(project_globals.YEARS, project_globals.SEXES, self.iron_groups))
+        self.birth_weight_stats = MeanVarianceAccumulator(len(self.strata))
 
-        columns_required = ['alive', f'{self.disease}', 'entrance_time', 'tracked',
-                            'sex', project_globals.IRON_FORTIFICATION_COVERAGE_MOM_COLUMN]
-
-        self.population_view = builder.population.get_view(columns_required)
+        columns_required = [f'{self.disease}', 'sex', project_globals.IRON_FORTIFICATION_COVERAGE_MOM_COLUMN]
+        self.population_view = builder.population.get_view(columns_required + ['tracked'])
+        builder.population.initializes_simulants(self.on_initialize_simulants,
+                                                 requires_columns=columns_required)
         builder.value.register_value_modifier('metrics', self.metrics)
 
+    def on_initialize_simulants(self, pop_data: 'SimulantData'):
+        year = pop_data.creation_time.year
+        if year not in project_globals.YEARS:
+            return
+        pop = self.population_view.get(pop_data.index)
+        sex = pd.Categorical(pop.sex, categories=['Male', 'Female']).codes
+        # The initial population has an unknown maternal iron status and is
+        # not counted.
+        iron_group = pd.Categorical(pop[project_globals.IRON_FORTIFICATION_COVERAGE_MOM_COLUMN],
+                                    categories=self.iron_groups).codes
+        observed = (sex >= 0) & (iron_group >= 0)
+        year_code = project_globals.YEARS.index(year)
+        strata = (year_code * len(project_globals.SEXES) + sex) * len(self.iron_groups) + iron_group
+        self.birth_weight_stats.update(strata[observed], pop.loc[observed, self.disease].values)
+
     def metrics(self, index, metrics):
-        pop = self.population_view.get(index)
-        birth_weights = get_birth_weights(pop)
+        stats = self.birth_weight_stats
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Sample standard deviation, as pandas reports it.
+            sd = np.sqrt(stats.sum_of_squares / (stats.count - 1))
+        birth_weights = {}
+        for (year, sex, iron_group), count, mean, sd in zip(self.strata, stats.count, stats.mean, sd):
+            suffix = f'in_{year}_among_{sex}_iron_fortification_group_{iron_group}'
+            birth_weights[f'birth_weight_mean_{suffix}'] = mean
+            birth_weights[f'birth_weight_sd_{suffix}'] = sd if count > 1 else np.nan
         metrics.update(birth_weights)
         return metrics
 
@@ -503,34 +827,6 @@ class BirthweightObserver:
         return project_globals.BIRTH_WEIGHT_OBSERVER
 
 
-def get_birth_weights(pop: pd.DataFrame) -> Dict[str, float]:
-    """Obtains mean birth_weight per stratification group.
-    Parameters
-    ----------
-    pop
-        The population dataframe to be counted. It must contain sufficient
-        columns for any necessary filtering (e.g. the ``age`` column if
-        filtering by age).
-    Returns
-    -------
-    birth_weights
-        birth_weight mean and standard deviation per category.
-    """
-    birth_weights = {}
-    pop['year'] = pd.DatetimeIndex(pop['entrance_time']).year
-    gb = pop.groupby(['year', 'sex', project_globals.IRON_FORTIFICATION_COVERAGE_MOM_COLUMN])
-    groups = itertools.product(project_globals.YEARS, ['Male', 'Female'], ['covered', 'uncovered'])
-    for group in groups:
-        df_group = gb.get_group(group) if group in gb.groups else pd.DataFrame({'birth_weight': [0.0]})
-        year, sex, treatment_group = group
-        bw_mean = f'birth_weight_mean_in_{year}_among_{sex.lower()}_iron_fortification_group_{treatment_group.lower()}'
-        bw_sd = f'birth_weight_sd_in_{year}_among_{sex.lower()}_iron_fortification_group_{treatment_group.lower()}'
-        birth_weights[bw_mean] = df_group.birth_weight.mean()
-        birth_weights[bw_sd] = df_group.birth_weight.std()
-
-    return birth_weights
-
-
 class LBWSGObserver:
 
     @property
@@ -583,12 +879,14 @@ class LBWSGObserver:
 
 
 class HemoglobinLevelObserver():
+    """Observes the mean and variance of hemoglobin levels at the
+    hemoglobin observation ages, stratified by age, iron fortification
+    coverage, iron responsiveness and sex."""
 
     @property
     def name(self):
         return project_globals.HEMOGLOBIN_OBSERVER
 
-
     def setup(self, builder):
         self.hemoglobin = builder.value.get_value(f'{project_globals.IRON_DEFICIENCY_MODEL_NAME}.exposure')
         self.iron_responsive = builder.value.get_value('iron_responsive')
@@ -596,78 +894,48 @@ class HemoglobinLevelObserver():
         self.population_view = builder.population.get_view(['age', 'sex',
                                                             project_globals.IRON_COVERAGE_START_AGE_COLUMN],
                                                            query='alive == "alive"')
-        self.results = self.get_results_template()
+        self.strata = list(itertools.product(project_globals.HEMOGLOBIN_AGE_GROUPS,
+                                             project_globals.HEMOGLOBIN_STATUS_GROUPS,
+                                             project_globals.HEMOGLOBIN_RESPONSE_GROUPS,
+                                             project_globals.SEXES))
+        self.hemoglobin_stats = MeanVarianceAccumulator(len(self.strata))
+        # Every stratum starts out with a single zero observation so that
+        # strata nobody is observed in report zeros rather than nan.
+        self.hemoglobin_stats.update(np.arange(len(self.strata)), np.zeros(len(self.strata)))
 
         builder.event.register_listener('collect_metrics', self.on_collect_metrics)
         builder.value.register_value_modifier('metrics', self.metrics)
 
     def on_collect_metrics(self, event):
         pop = self.population_view.get(event.index)
-        for age in project_globals.HEMOGLOBIN_AGE_GROUPS:
-            pop_age = pop[(float(age) <= pop.age) & (pop.age < float(age) + to_years(event.step_size))]
-
-            responsive = self.iron_responsive(pop_age.index)
-            idx_resp = responsive[responsive].index
-            idx_non_resp = responsive[~responsive].index
-
-            idx_covered = pop_age.loc[(pop_age.age > 0.5)
-                                      & (~pop_age.get(project_globals.IRON_COVERAGE_START_AGE_COLUMN).isnull())].index
-            idx_uncovered = pop_age.index.difference(idx_covered)
-
-            categories = itertools.product([('covered', idx_covered), ('uncovered', idx_uncovered)],
-                                           [('responsive', idx_resp), ('non-responsive', idx_non_resp)])
-            for covered_cat, responsive_cat in categories:
-                cov_label, cov_index = covered_cat
-                resp_label, resp_index = responsive_cat
-                idx = cov_index.intersection(resp_index)
-                pop_in_group = pop_age.loc[idx]
-
-                stats = self.get_hemoglobin_stats(pop_in_group)
-                stats = {f'{k}_at_age_{age}_status_{cov_label}_responsive_{resp_label}': v
-                          for k, v in stats.items()}
-                update_list(self.results, stats)
-
-    def get_results_template(self):
-        stats = {}
-        categories = itertools.product(project_globals.HEMOGLOBIN_AGE_GROUPS,
-                                       project_globals.HEMOGLOBIN_STATUS_GROUPS,
-                                       project_globals.HEMOGLOBIN_RESPONSE_GROUPS,
-                                       project_globals.SEXES,)
-        for age, covered_cat, responsive_cat, sex in categories:
-            suffix = f'age_{age}_status_{covered_cat}_responsive_{responsive_cat}'
-            stats[f'hemoglobin_mean_among_{sex}_at_{suffix}'] = [0.0]
-        return stats
-
-
-    def get_hemoglobin_stats(self, pop):
-        stats = {}
-        if not pop.empty:
-            pop = pop.drop(columns='age')
-            pop['hemoglobin_level'] = self.hemoglobin(pop.index)
-            stats[f'hemoglobin_mean_among_male'] = pop.query('sex=="Male"')['hemoglobin_level'].values
-            stats[f'hemoglobin_mean_among_female'] = pop.query('sex=="Female"')['hemoglobin_level'].values
-        return stats
+        age_group = np.full(len(pop), -1, dtype=np.int64)
+        for code, age in enumerate(project_globals.HEMOGLOBIN_AGE_GROUPS):
+            age_group[((float(age) <= pop.age) & (pop.age < float(age) + to_years(event.step_size))).values] = code
+        sex = pd.Categorical(pop.sex, categories=['Male', 'Female']).codes
+        observed = (age_group >= 0) & (sex >= 0)
+        pop, age_group, sex = pop[observed], age_group[observed], sex[observed]
+        if pop.empty:
+            return
+
+        covered = ((pop.age > 0.5) & pop[project_globals.IRON_COVERAGE_START_AGE_COLUMN].notnull()).values
+        responsive = self.iron_responsive(pop.index).values
+        # Strata are ordered by age, coverage status, responsiveness and sex,
+        # with covered, responsive and male first.
+        strata = ((age_group * 2 + ~covered) * 2 + ~responsive) * 2 + sex
+        self.hemoglobin_stats.update(strata, self.hemoglobin(pop.index).values)
 
     def metrics(self, index, metrics):
-        final_results = post_process_hemoglobin(self.results)
-        metrics.update(final_results)
+        results = {}
+        for (age, covered_cat, responsive_cat, sex), mean, variance in zip(self.strata,
+                                                                           self.hemoglobin_stats.mean,
+                                                                           self.hemoglobin_stats.variance):
+            suffix = f'among_{sex}_at_age_{age}_status_{covered_cat}_responsive_{responsive_cat}'
+            results[f'hemoglobin_mean_{suffix}'] = mean
+            results[f'hemoglobin_variance_{suffix}'] = variance
+        metrics.update(results)
         return metrics
 
 
-def update_list(master : dict, data_to_add : dict):
-    for k in data_to_add.keys():
-        master[k].extend(data_to_add[k])
-
-
-def post_process_hemoglobin(raw_results: dict):
-    final_results = {}
-    for k in raw_results.keys():
-        final_results[k] = np.mean(raw_results[k])
-        variance_key = k.replace('mean', 'variance')
-        final_results[variance_key] = np.var(raw_results[k])
-    return final_results
-
-
 class AnemiaObserver:
     """Observes person time in the various anemia states"""
     configuration_defaults = {
@@ -676,6 +944,7 @@ class AnemiaObserver:
                 'by_age': True,
                 'by_year': True,
                 'by_sex': True,
+                'observation_interval': 1,
             }
         }
     }
@@ -694,9 +963,12 @@ class AnemiaObserver:
         self.config = builder.configuration['metrics']['anemia_observer'].to_dict()
         self.clock = builder.time.clock()
         self.age_bins = get_age_bins(builder)
-        self.person_time = Counter()
         self.anemia_severity = builder.value.get_value('anemia_severity')
         self.states = project_globals.ANEMIA_SEVERITY_GROUPS
+        self.measures = [f'anemia_{state}_person_time' for state in self.states]
+        self.person_time = ObservationTensor.from_builder(builder, self.measures, self.config)
+        self.start_time = self.clock()
+        self.end_time = pd.Timestamp(**builder.configuration.time.end.to_dict())
 
         columns_required = ['alive']
         if self.config['by_age']:
@@ -712,19 +984,21 @@ class AnemiaObserver:
         builder.event.register_listener('time_step__prepare', self.on_time_step_prepare)
 
     def on_time_step_prepare(self, event: 'Event'):
+        weight = get_observation_weight(self.clock(), event.step_size, self.start_time, self.end_time,
+                                        self.config['observation_interval'])
+        if not weight:
+            return
         pop = self.population_view.get(event.index)
-        pop['anemia'] = self.anemia_severity(pop.index)
-        # Ignoring the edge case where the step spans a new year.
+        group_codes, _ = get_age_sex_groups(pop, self.config, self.age_bins)
+        # Severity codes follow the order of the observed states.
+        severity = self.anemia_severity(pop.index).cat.codes.values.astype(np.int64)
+        severity[(pop.alive != 'alive').values] = -1
+        person_time = np.full(len(pop), to_years(weight))
+        # Ignoring the edge case where the observation spans a new year.
         # Accrue all counts and time to the current year.
-        for state in self.states:
-            base_key = get_output_template(**self.config).substitute(measure=f'anemia_{state}_person_time',
-                                                                     year=self.clock().year)
-            base_filter = QueryString(f'alive == "alive" and anemia == "{state}"')
-            # noinspection PyTypeChecker
-            person_time = get_group_counts(pop, base_filter, base_key, self.config, self.age_bins,
-                                           aggregate=lambda x: len(x) * to_years(event.step_size))
-            self.person_time.update(person_time)
+        self.person_time.add_by_measure(self.measures, severity, self.clock().year, None, group_codes,
+                                        weights=person_time)
 
     def metrics(self, index: pd.Index, metrics: Dict[str, float]):
-        metrics.update(self.person_time)
+        metrics.update(self.person_time.to_dict())
         return metrics
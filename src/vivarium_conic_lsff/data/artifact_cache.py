@@ -0,0 +1,117 @@
+"""Process-wide cache for data stored by draw in the artifact.
+
+The LBWSG exposure and relative risk data are too large to store in the
+standard artifact format, so they are stored with one ``index`` table and
+one ``draw_{n}`` column per draw under each key.  Several components read
+the same keys during setup, so this module holds a single read-only store
+handle per artifact and memoizes the decoded index table and each draw
+column.  Memory then scales with the number of (key, draw) pairs a process
+uses rather than with the number of components that read them.
+
+Draw columns can optionally be served as read-only memory-mapped arrays,
+which lets simulation processes on the same node share the pages.
+"""
+import atexit
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+MMAP_DIR = Path(tempfile.gettempdir()) / 'vivarium_conic_lsff_draws'
+
+_stores: Dict[str, pd.HDFStore] = {}
+_index_cache: Dict[Tuple[str, str], pd.DataFrame] = {}
+_draw_cache: Dict[Tuple[str, str, int, bool], np.ndarray] = {}
+
+
+def read_data_by_draw(artifact_path: str, key: str, draw: int, mmap: bool = False) -> pd.DataFrame:
+    """Reads the index and a single draw of a key stored by draw.
+
+    Parameters
+    ----------
+    artifact_path
+        The artifact to read from.
+    key
+        The entity key associated with the data to read.
+    draw
+        The draw to retrieve.
+    mmap
+        Whether to back the draw column with a memory-mapped file.
+
+    Returns
+    -------
+        The index table with the draw appended as a ``value`` column
+        and the ``location`` column removed.
+
+    """
+    index = read_index(artifact_path, key)
+    data = index.drop(columns='location')
+    data['value'] = read_draw(artifact_path, key, draw, mmap)
+    return data
+
+
+def read_index(artifact_path: str, key: str) -> pd.DataFrame:
+    """Reads the shared index table of a key stored by draw.
+
+    The cached table is returned, so callers must not modify it in place.
+    """
+    cache_key = (str(artifact_path), key)
+    if cache_key not in _index_cache:
+        _index_cache[cache_key] = _get_store(artifact_path).get(f'{_to_path(key)}/index')
+    return _index_cache[cache_key]
+
+
+def read_draw(artifact_path: str, key: str, draw: int, mmap: bool = False) -> np.ndarray:
+    """Reads a single draw column of a key stored by draw as a read-only
+    array, optionally memory-mapped."""
+    cache_key = (str(artifact_path), key, draw, mmap)
+    if cache_key not in _draw_cache:
+        values = _get_store(artifact_path).get(f'{_to_path(key)}/draw_{draw}').values
+        if mmap:
+            values = _to_memory_map(values, *cache_key[:3])
+        else:
+            values.flags.writeable = False
+        _draw_cache[cache_key] = values
+    return _draw_cache[cache_key]
+
+
+def clear_cache():
+    """Closes all open stores and drops all cached data."""
+    for store in _stores.values():
+        store.close()
+    _stores.clear()
+    _index_cache.clear()
+    _draw_cache.clear()
+
+
+def _get_store(artifact_path: str) -> pd.HDFStore:
+    artifact_path = str(artifact_path)
+    if artifact_path not in _stores:
+        _stores[artifact_path] = pd.HDFStore(artifact_path, mode='r')
+    return _stores[artifact_path]
+
+
+def _to_memory_map(values: np.ndarray, artifact_path: str, key: str, draw: int) -> np.ndarray:
+    # Key the file on the artifact's modification time so a rebuilt
+    # artifact never serves stale draws.
+    modified = Path(artifact_path).stat().st_mtime_ns
+    name = hashlib.sha1(f'{artifact_path}:{modified}:{key}:{draw}'.encode()).hexdigest()
+    path = MMAP_DIR / f'{name}.npy'
+    if not path.exists():
+        MMAP_DIR.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so concurrent processes never
+        # map a partially written array.
+        with tempfile.NamedTemporaryFile(dir=str(MMAP_DIR), suffix='.npy', delete=False) as f:
+            np.save(f, values)
+        Path(f.name).replace(path)
+    return np.load(str(path), mmap_mode='r')
+
+
+def _to_path(key: str) -> str:
+    return key.replace('.', '/')
+
+
+atexit.register(clear_cache)
@@ -0,0 +1,519 @@
+"""
+Standalone exposure distributions that don't depend on a simulation.
+
+These can be used to sample from the model's distributions outside a
+simulation (e.g. for calibration or to recompute population attributable
+fractions), and are wrapped by the simulation components.
+"""
+import hashlib
+import json
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import scipy.stats
+
+from vivarium_conic_lsff import globals as project_globals
+
+RandomState = Union[np.random.RandomState, np.random.Generator]
+
+# Bump when the layout or meaning of the cached category table changes.
+CATEGORY_TABLE_VERSION = 1
+CATEGORY_TABLE_CACHE_DIR = Path(tempfile.gettempdir()) / 'vivarium_conic_lsff_lbwsg_categories'
+
+
+class CategoryGrid(NamedTuple):
+    """Rectangular index over the LBWSG categories.
+
+    ``categories`` has one row per birth weight bin and one column per
+    gestation time bin, where the bins are delimited by ``bw_edges`` and
+    ``gt_edges``.  Cells hold category positions, or -1 where no category
+    covers the cell.
+    """
+    bw_edges: np.ndarray
+    gt_edges: np.ndarray
+    categories: np.ndarray
+    max_gt_by_bw_bin: np.ndarray
+    max_bw_by_gt_bin: np.ndarray
+
+
+class CategoryTable(NamedTuple):
+    """The LBWSG categories parsed into plain arrays.
+
+    ``lower_bounds`` and ``widths`` have one row per category and one column
+    per entry in ``project_globals.LBWSG_COLUMNS``.
+    """
+    categories: np.ndarray
+    lower_bounds: np.ndarray
+    widths: np.ndarray
+    grid: CategoryGrid
+
+
+_category_tables: Dict[str, CategoryTable] = {}
+
+
+class LBWSGJointDistribution:
+    """The joint distribution of birth weight and gestation time.
+
+    The LBWSG exposure is categorical, with each category covering a
+    rectangle of birth weight and gestation time.  Continuous values are
+    uniformly distributed within a category.
+
+    Parameters
+    ----------
+    category_dict
+        Mapping from category to GBD category name, which holds the
+        bounds of the category.  Categories keep the order of the mapping.
+    exposure
+        Category prevalences in the order of ``category_dict``, either a
+        single distribution or one row per demographic group.
+
+    """
+
+    def __init__(self, category_dict: Dict[str, str], exposure: np.ndarray):
+        self.categories, self.lower_bounds, self.widths, self.grid = get_category_table(category_dict)
+        self.exposure = np.atleast_2d(np.asarray(exposure, dtype=float))
+        if self.exposure.shape[1] != len(self.categories):
+            raise ValueError(f'Exposure has {self.exposure.shape[1]} categories, '
+                             f'expected {len(self.categories)}.')
+
+    def sample(self, n: int, rng: RandomState, row: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Draws ``n`` birth weights and gestation times from the exposure
+        distribution in ``row``."""
+        category_u, bw_u, gt_u = rng.uniform(size=(3, n))
+        return self.ppf(category_u, bw_u, gt_u, self.exposure[row])
+
+    def ppf(self, category_u: np.ndarray, bw_u: np.ndarray, gt_u: np.ndarray,
+            exposure: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Maps uniform draws to birth weights and gestation times.
+
+        Parameters
+        ----------
+        category_u
+            Uniform draws used to choose a category.
+        bw_u
+            Uniform draws used to place the birth weight within the category.
+        gt_u
+            Uniform draws used to place the gestation time within the category.
+        exposure
+            Category prevalences, either a single distribution or one row
+            per draw.  Defaults to the first exposure row.
+
+        Returns
+        -------
+            Birth weights and gestation times.
+
+        """
+        exposure = self.exposure[0] if exposure is None else np.asarray(exposure)
+        category_index = self.choose_category(category_u, exposure)
+        values = sample_from_category_bounds(category_index, np.column_stack([bw_u, gt_u]),
+                                             self.lower_bounds, self.widths)
+        return values[:, 0], values[:, 1]
+
+    def choose_category(self, category_u: np.ndarray, exposure: np.ndarray) -> np.ndarray:
+        """Maps uniform draws to category positions by inverting the
+        cumulative exposure."""
+        category_u = np.asarray(category_u)
+        if exposure.ndim == 1:
+            category_index = np.searchsorted(np.cumsum(exposure), category_u, side='left')
+        else:
+            category_index = (np.cumsum(exposure, axis=1) < category_u[:, np.newaxis]).sum(axis=1)
+        # Guard against prevalences that sum to slightly less than one.
+        return np.minimum(category_index, len(self.categories) - 1)
+
+    def categorize(self, bw: np.ndarray, gt: np.ndarray) -> np.ndarray:
+        """Finds the category position of each birth weight and gestation time.
+
+        Values that fall in a gap in the category grid are first moved to
+        the nearest category as described in :func:`correct_boundary_cases`.
+        Positions are -1 where no category covers the corrected values.
+        """
+        return correct_boundary_cases(self.grid, np.column_stack([bw, gt]).astype(float))
+
+    def correct_boundary_cases(self, bw: np.ndarray, gt: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Moves values outside the category grid to the edge of the
+        nearest category and returns the corrected birth weights and
+        gestation times."""
+        exposure = np.column_stack([bw, gt]).astype(float)
+        correct_boundary_cases(self.grid, exposure)
+        return exposure[:, 0], exposure[:, 1]
+
+    def mean_rr(self, rr_table: np.ndarray) -> np.ndarray:
+        """Exposure weighted mean relative risk of each exposure row.
+
+        ``rr_table`` holds relative risks in category order, either a
+        single set or one row per exposure row.
+        """
+        return (self.exposure * np.asarray(rr_table)).sum(axis=1)
+
+
+def correct_boundary_cases(grid: CategoryGrid, exposure: np.ndarray) -> np.ndarray:
+    """Moves values outside the category grid to the edge of the nearest
+    category, in place.
+
+    Light births with long gestation are moved down to the longest
+    gestation for their birth weight, heavy births with short gestation are
+    moved left to the heaviest birth weight for their gestation time, and
+    births beyond both maxima are moved to the TMREL.
+
+    Parameters
+    ----------
+    grid
+        The category grid.
+    exposure
+        A float64 buffer with one row per simulant and one column per
+        entry in ``project_globals.LBWSG_COLUMNS``.  Corrected in place.
+
+    Returns
+    -------
+        The category position of each corrected row, or -1 where no
+        category covers it.
+
+    """
+    bw_bin = get_bin_index(grid.bw_edges, exposure[:, 0])
+    gt_bin = get_bin_index(grid.gt_edges, exposure[:, 1])
+    category_index = lookup_category(grid, bw_bin, gt_bin)
+
+    # Nearly everyone falls in a category, so only the rest are corrected.
+    outside_bounds = np.flatnonzero(category_index == -1)
+    if not outside_bounds.size:
+        return category_index
+    bw, gt = exposure[outside_bounds, 0], exposure[outside_bounds, 1]
+    bw_bin, gt_bin = bw_bin[outside_bounds], gt_bin[outside_bounds]
+
+    eps = 1e-4
+    max_bw, max_gt = project_globals.MAX_BIRTH_WEIGHT, project_globals.MAX_GESTATIONAL_TIME
+    shift_down = (bw < 1000) | ((1000 < bw) & (bw < max_bw) & (40 < gt))
+    shift_left = ((1000 < bw) & (gt < 34)) | ((max_bw < bw) & (gt < max_gt))
+    tmrel = (max_bw < bw) & (max_gt < gt)
+    # The three cases are disjoint.  Bins of -1 gather junk that is never selected.
+    bw = np.where(shift_left, grid.max_bw_by_gt_bin[gt_bin] - eps, np.where(tmrel, max_bw - eps, bw))
+    gt = np.where(shift_down, grid.max_gt_by_bw_bin[bw_bin] - eps, np.where(tmrel, max_gt - eps, gt))
+
+    exposure[outside_bounds, 0] = bw
+    exposure[outside_bounds, 1] = gt
+    category_index[outside_bounds] = lookup_category(grid,
+                                                     get_bin_index(grid.bw_edges, bw),
+                                                     get_bin_index(grid.gt_edges, gt))
+    return category_index
+
+
+def get_category_table(category_dict: Dict[str, str],
+                       cache_dir: Optional[Path] = CATEGORY_TABLE_CACHE_DIR) -> CategoryTable:
+    """Parses the LBWSG category names into a :class:`CategoryTable`.
+
+    Tables are cached in memory and in ``cache_dir`` under a hash of the
+    category dict, so the names are parsed once per category set rather than
+    once per simulation.  Pass ``None`` to skip the on-disk cache.
+    """
+    key = hash_category_dict(category_dict)
+    if key not in _category_tables:
+        path = Path(cache_dir) / f'lbwsg_categories_v{CATEGORY_TABLE_VERSION}_{key}.npz' if cache_dir else None
+        table = _read_category_table(path) if path else None
+        if table is None:
+            table = build_category_table(category_dict)
+            if path:
+                _write_category_table(path, table)
+        _category_tables[key] = table
+    return _category_tables[key]
+
+
+def build_category_table(category_dict: Dict[str, str]) -> CategoryTable:
+    """Parses the LBWSG category names into a :class:`CategoryTable`."""
+    lower_bounds, widths = get_category_bounds(category_dict.values())
+    return CategoryTable(categories=np.array(list(category_dict.keys())),
+                         lower_bounds=lower_bounds,
+                         widths=widths,
+                         grid=get_category_grid(lower_bounds, widths))
+
+
+def hash_category_dict(category_dict: Dict[str, str]) -> str:
+    """Hashes the category dict, including the order of the categories."""
+    return hashlib.sha1(json.dumps(list(category_dict.items())).encode()).hexdigest()
+
+
+def _read_category_table(path: Path) -> Optional[CategoryTable]:
+    try:
+        with np.load(str(path), allow_pickle=False) as data:
+            return CategoryTable(categories=data['categories'],
+                                 lower_bounds=data['lower_bounds'],
+                                 widths=data['widths'],
+                                 grid=CategoryGrid(*[data[f'grid_{field}'] for field in CategoryGrid._fields]))
+    except (OSError, KeyError, ValueError):
+        # Missing, unreadable or stale files are rebuilt.
+        return None
+
+
+def _write_category_table(path: Path, table: CategoryTable):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so concurrent jobs never read a
+        # partially written table.
+        with tempfile.NamedTemporaryFile(dir=str(path.parent), suffix='.npz', delete=False) as f:
+            np.savez(f, categories=table.categories, lower_bounds=table.lower_bounds,
+                     widths=table.widths,
+                     **{f'grid_{field}': value for field, value in table.grid._asdict().items()})
+        Path(f.name).replace(path)
+    except OSError:
+        # The cache is an optimization, so a read only file system is fine.
+        pass
+
+
+def get_bounds_from_name(name: str) -> Tuple[float, float, float, float]:
+    """Parses a LBWSG category name into its birth weight start and end and
+    gestation time start and end."""
+    numbers_only = (name.replace('Birth prevalence - [', '')
+                    .replace(',', '')
+                    .replace(') wks [', ' ')
+                    .replace(') g', ''))
+    gt_start, gt_end, bw_start, bw_end = [int(n) for n in numbers_only.split()]
+    return bw_start, bw_end, gt_start, gt_end
+
+
+def get_category_bounds(names) -> Tuple[np.ndarray, np.ndarray]:
+    """Converts LBWSG category names to arrays of lower bounds and widths.
+
+    Both arrays have one row per category and one column per entry in
+    ``project_globals.LBWSG_COLUMNS``.
+    """
+    bounds = np.array([get_bounds_from_name(name) for name in names], dtype=float).reshape(-1, 4)
+    lower_bounds = bounds[:, [0, 2]]
+    upper_bounds = bounds[:, [1, 3]]
+    return lower_bounds, upper_bounds - lower_bounds
+
+
+def sample_from_category_bounds(category_index: np.ndarray, draws: np.ndarray,
+                                lower_bounds: np.ndarray, widths: np.ndarray) -> np.ndarray:
+    """Maps uniform draws onto the bounds of each simulant's category.
+
+    Parameters
+    ----------
+    category_index
+        Integer positions of each simulant's category in the bound arrays.
+    draws
+        Uniform draws with one row per simulant and one column per
+        exposure dimension.
+    lower_bounds
+        Category lower bounds as returned by :func:`get_category_bounds`.
+    widths
+        Category widths as returned by :func:`get_category_bounds`.
+
+    Returns
+    -------
+        Continuous exposure values with the same shape as ``draws``.
+    """
+    return lower_bounds[category_index] + draws * widths[category_index]
+
+
+def get_category_grid(lower_bounds: np.ndarray, widths: np.ndarray) -> CategoryGrid:
+    """Builds the grid index from the category bounds returned by
+    :func:`get_category_bounds`."""
+    upper_bounds = lower_bounds + widths
+    bw_edges = np.unique(np.concatenate([lower_bounds[:, 0], upper_bounds[:, 0]]))
+    gt_edges = np.unique(np.concatenate([lower_bounds[:, 1], upper_bounds[:, 1]]))
+
+    categories = np.full((len(bw_edges) - 1, len(gt_edges) - 1), -1, dtype=np.int64)
+    for category, (lower, upper) in enumerate(zip(lower_bounds, upper_bounds)):
+        bw_start, bw_end = np.searchsorted(bw_edges, [lower[0], upper[0]])
+        gt_start, gt_end = np.searchsorted(gt_edges, [lower[1], upper[1]])
+        categories[bw_start:bw_end, gt_start:gt_end] = category
+
+    def max_upper_bound(cells, axis):
+        bounds = np.where(cells >= 0, upper_bounds[cells, axis], -np.inf).max(axis=1)
+        return np.where(np.isfinite(bounds), bounds, np.nan)
+
+    return CategoryGrid(bw_edges=bw_edges,
+                        gt_edges=gt_edges,
+                        categories=categories,
+                        max_gt_by_bw_bin=max_upper_bound(categories, axis=1),
+                        max_bw_by_gt_bin=max_upper_bound(categories.T, axis=0))
+
+
+def get_bin_index(edges: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Finds the left closed bin of each value, or -1 if it is outside
+    the edges."""
+    bin_index = np.searchsorted(edges, values, side='right') - 1
+    bin_index[(bin_index < 0) | (bin_index >= len(edges) - 1)] = -1
+    return bin_index
+
+
+def lookup_category(grid: CategoryGrid, bw_bin: np.ndarray, gt_bin: np.ndarray) -> np.ndarray:
+    """Maps birth weight and gestation time bins to category positions, or
+    -1 where the pair is not covered by a category."""
+    category_index = grid.categories[bw_bin, gt_bin]
+    category_index[(bw_bin == -1) | (gt_bin == -1)] = -1
+    return category_index
+
+
+def get_hemoglobin_ppf(q: np.ndarray, mean: np.ndarray, sd: np.ndarray) -> np.ndarray:
+    """The hemoglobin exposure at quantile ``q``.
+
+    Hemoglobin is modeled as a weighted ensemble of the quantiles of a gamma
+    and a mirrored Gumbel distribution with the given mean and standard
+    deviation.
+    """
+    return (project_globals.HEMOGLOBIN_DISTRIBUTION.WEIGHT_GAMMA * get_gamma_ppf(q, mean, sd)
+            + project_globals.HEMOGLOBIN_DISTRIBUTION.WEIGHT_GUMBEL * get_mirrored_gumbel_ppf(q, mean, sd))
+
+
+def get_gamma_ppf(q: np.ndarray, mean: np.ndarray, sd: np.ndarray) -> np.ndarray:
+    shape = (mean / sd)**2
+    scale = sd**2 / mean
+    return scipy.stats.gamma(a=shape, scale=scale).ppf(q)
+
+
+def get_mirrored_gumbel_ppf(q: np.ndarray, mean: np.ndarray, sd: np.ndarray) -> np.ndarray:
+    x_max = project_globals.HEMOGLOBIN_DISTRIBUTION.EXPOSURE_MAX
+    alpha = x_max - mean - (sd * np.euler_gamma * np.sqrt(6) / np.pi)
+    scale = sd * np.sqrt(6) / np.pi
+    return x_max - scipy.stats.gumbel_r(alpha, scale=scale).ppf(1 - q)
+
+
+class TabulatedPPF:
+    """Inverse CDF lookup tables for a family of distributions.
+
+    Models often look up distribution parameters by demographic group, so
+    only a handful of distinct parameter rows are ever used.  This builds a
+    quantile table for each distinct row and answers ppf queries by linear
+    interpolation instead of calling the exact ppf.
+
+    The tables share a grid that is evenly spaced in the log odds of the
+    quantile, which keeps the tails close to linear.  The grid is doubled
+    until linear interpolation is within ``tolerance`` of the exact ppf
+    half way between every pair of grid points, for every parameter row.
+    Rows are added as they are first queried, or ahead of time with
+    :meth:`TabulatedPPF.add_parameters`.
+
+    Parameters
+    ----------
+    ppf
+        The exact ppf, taking quantiles followed by one array per
+        distribution parameter.
+    lower
+        The smallest quantile that will be queried.
+    upper
+        The largest quantile that will be queried.
+    tolerance
+        The largest acceptable absolute interpolation error.
+    initial_size
+        The number of grid points to start refining from.
+    max_size
+        The number of grid points to stop refining at.
+
+    """
+
+    def __init__(self, ppf: Callable[..., np.ndarray], lower: float, upper: float, tolerance: float,
+                 initial_size: int = 65, max_size: int = 2**16 + 1):
+        if not 0 < lower < upper < 1:
+            raise ValueError(f'Quantile bounds must satisfy 0 < lower < upper < 1, got {lower} and {upper}.')
+        self._ppf = ppf
+        self.tolerance = tolerance
+        self.max_size = max_size
+        self._x_start, x_end = _logit(lower), _logit(upper)
+        self._x_width = x_end - self._x_start
+        self.size = initial_size
+        self.parameters = None
+        self.tables = None
+        self._index = None
+
+    def __call__(self, q: np.ndarray, *parameters: np.ndarray) -> np.ndarray:
+        """Interpolates the ppf at quantiles ``q`` with one parameter value
+        per quantile for each distribution parameter.  Quantiles must be
+        within the bounds the tables were built for."""
+        parameters = pd.MultiIndex.from_arrays([np.asarray(p, dtype=float) for p in parameters])
+        rows = self._get_rows(parameters)
+        if (rows < 0).any():
+            self.add_parameters(np.array(parameters[rows < 0].unique().tolist()))
+            rows = self._get_rows(parameters)
+
+        position = (_logit(np.asarray(q, dtype=float)) - self._x_start) / self._x_width * (self.size - 1)
+        left = np.clip(np.floor(position).astype(np.int64), 0, self.size - 2)
+        fraction = position - left
+        left_values = self.tables[rows, left]
+        return left_values + fraction * (self.tables[rows, left + 1] - left_values)
+
+    def add_parameters(self, parameters: np.ndarray):
+        """Builds tables for parameter rows, one row per distribution, that
+        do not have one yet."""
+        parameters = np.atleast_2d(np.asarray(parameters, dtype=float))
+        parameters = np.unique(parameters, axis=0)
+        if self.parameters is not None:
+            parameters = parameters[self._get_rows(pd.MultiIndex.from_arrays(parameters.T)) < 0]
+        if not len(parameters):
+            return
+
+        new_tables, size = self._build_tables(parameters, self.size)
+        if self.parameters is None:
+            self.parameters, self.tables = parameters, new_tables
+        elif size == self.size:
+            self.parameters = np.vstack([self.parameters, parameters])
+            self.tables = np.vstack([self.tables, new_tables])
+        else:
+            # The new rows need a finer grid than the existing tables.
+            self.parameters = np.vstack([self.parameters, parameters])
+            self.tables = self._build_tables(self.parameters, size)[0]
+        self.size = size
+        self._index = pd.MultiIndex.from_arrays(self.parameters.T)
+
+    def _get_rows(self, parameters: pd.MultiIndex) -> np.ndarray:
+        if self.parameters is None:
+            return np.full(len(parameters), -1)
+        return self._index.get_indexer(parameters)
+
+    def _build_tables(self, parameters: np.ndarray, size: int) -> Tuple[np.ndarray, int]:
+        while True:
+            tables = self._evaluate(parameters, np.linspace(0, 1, size))
+            midpoints = self._evaluate(parameters, (np.arange(size - 1) + 0.5) / (size - 1))
+            error = np.abs((tables[:, :-1] + tables[:, 1:]) / 2 - midpoints).max()
+            if error <= self.tolerance:
+                return tables, size
+            if 2 * size - 1 > self.max_size:
+                raise ValueError(f'Could not reach a ppf tolerance of {self.tolerance} with '
+                                 f'{self.max_size} grid points. The error was {error}.')
+            size = 2 * size - 1
+
+    def _evaluate(self, parameters: np.ndarray, grid: np.ndarray) -> np.ndarray:
+        q = _expit(self._x_start + grid * self._x_width)
+        return self._ppf(q[np.newaxis, :], *(parameters[:, [i]] for i in range(parameters.shape[1])))
+
+
+class PiecewiseLinearDistribution:
+    """A distribution with a piecewise linear quantile function.
+
+    Parameters
+    ----------
+    quantiles
+        The value of the quantile function at each knot, in increasing order.
+    probabilities
+        The probability at each knot, increasing from 0 to 1.  Knots are
+        evenly spaced if not provided.
+
+    """
+
+    def __init__(self, quantiles: Sequence[float], probabilities: Sequence[float] = None):
+        self.quantiles = np.asarray(quantiles, dtype=float)
+        if probabilities is None:
+            probabilities = np.linspace(0, 1, len(self.quantiles))
+        self.probabilities = np.asarray(probabilities, dtype=float)
+        if (len(self.quantiles) < 2 or self.probabilities.shape != self.quantiles.shape
+                or self.probabilities[0] != 0 or self.probabilities[-1] != 1
+                or np.any(np.diff(self.probabilities) <= 0) or np.any(np.diff(self.quantiles) < 0)):
+            raise ValueError(f'Invalid knots for a piecewise linear quantile function: '
+                             f'quantiles {self.quantiles} at probabilities {self.probabilities}.')
+
+    @property
+    def mean(self) -> float:
+        return float(np.sum(np.diff(self.probabilities) * (self.quantiles[:-1] + self.quantiles[1:]) / 2))
+
+    def ppf(self, q: np.ndarray) -> np.ndarray:
+        return np.interp(q, self.probabilities, self.quantiles)
+
+
+def _logit(p):
+    return np.log(p) - np.log1p(-p)
+
+
+def _expit(x):
+    return 1 / (1 + np.exp(-x))
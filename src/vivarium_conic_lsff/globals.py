@@ -604,6 +604,19 @@ HEMOGLOBIN_STATUS_GROUPS = ['covered', 'uncovered']
 HEMOGLOBIN_RESPONSE_GROUPS = ['responsive', 'non-responsive']
 
 
+class __CATEGORY_DTYPES(NamedTuple):
+    """Integer coded dtypes shared by category valued pipelines and state
+    table columns.  Labels are only read back at the observer output
+    boundary."""
+    VITAMIN_A_EXPOSURE: pd.CategoricalDtype = pd.CategoricalDtype(VITAMIN_A_RISK_CATEGORIES)
+    ANEMIA_SEVERITY: pd.CategoricalDtype = pd.CategoricalDtype(ANEMIA_SEVERITY_GROUPS)
+    MATERNAL_FORTIFICATION_COVERAGE: pd.CategoricalDtype = pd.CategoricalDtype(FOLIC_ACID_FORTIFICATION_GROUPS)
+    VITAMIN_A_FORTIFICATION_COVERAGE: pd.CategoricalDtype = pd.CategoricalDtype(VITAMIN_A_FORTIFICATION_GROUPS)
+
+
+CATEGORY_DTYPES = __CATEGORY_DTYPES()
+
+
 #################################
 # Results columns and variables #
 #################################
@@ -1,6 +1,6 @@
 import click
 from pathlib import Path
-from typing import Union, List
+from typing import Callable, Union, List
 
 from loguru import logger
 import numpy as np
@@ -9,6 +9,7 @@ import scipy.stats
 from vivarium_public_health.risks.data_transformations import pivot_categorical
 
 from vivarium_conic_lsff import globals as project_globals
+from vivarium_conic_lsff.data import artifact_cache
 
 
 def len_longest_location() -> int:
@@ -68,18 +69,170 @@ def read_data_by_draw(artifact_path: str, key : str, draw: int) -> pd.DataFrame:
         The data to retrieve.
 
     """
-    key = key.replace(".", "/")
-    with pd.HDFStore(artifact_path, mode='r') as store:
-        index = store.get(f'{key}/index')
-        draw = store.get(f'{key}/draw_{draw}')
-    draw = draw.rename("value")
-    data = pd.concat([index, draw], axis=1)
-    data = data.drop(columns='location')
+    data = artifact_cache.read_data_by_draw(artifact_path, key, draw)
     data = pivot_categorical(data)
     data[project_globals.LBWSG_MISSING_CATEGORY.CAT] = project_globals.LBWSG_MISSING_CATEGORY.EXPOSURE
     return data
 
 
+def get_codes(dtype: pd.CategoricalDtype, labels: List[str]) -> np.ndarray:
+    """Returns the integer codes of ``labels`` in a categorical dtype."""
+    codes = dtype.categories.get_indexer(labels)
+    if (codes < 0).any():
+        raise ValueError(f'Labels {labels} are not all categories of {dtype}.')
+    return codes
+
+
+def to_categorical(codes: np.ndarray, dtype: pd.CategoricalDtype,
+                   index: pd.Index, name: str = None) -> pd.Series:
+    """Wraps integer codes into a categorical series without building
+    any label strings."""
+    return pd.Series(pd.Categorical.from_codes(codes, dtype.categories, dtype.ordered), index=index, name=name)
+
+
+def lookup_categorical(data: pd.DataFrame, category: pd.Series) -> np.ndarray:
+    """Gathers, for each row of ``data``, the value in the column named by
+    the categorical ``category``.
+
+    This is the positional equivalent of ``data.lookup(data.index, category)``
+    and assumes both are aligned.
+    """
+    return lookup_codes(data, category.cat.codes.values, category.cat.categories)
+
+
+def lookup_codes(data: pd.DataFrame, codes: np.ndarray, categories: pd.Index) -> np.ndarray:
+    """Gathers, for each row of ``data``, the value in the column named by
+    the category with the given integer code."""
+    columns = data.columns.get_indexer(categories)[codes]
+    return data.values[np.arange(len(data)), columns]
+
+
+class StepCache:
+    """Memoizes a per-simulant computation for the duration of a time step.
+
+    The first request in a time step computes values for the requested
+    simulants.  Later requests in the same step are served from the cache,
+    computing values only for simulants that have not been seen yet.  The
+    cache is dropped whenever the simulation clock moves.  Components should
+    call :meth:`StepCache.invalidate` when the inputs to the computation
+    change within a step (e.g. when simulants are initialized).
+
+    Served values must not be modified by the caller.
+
+    Parameters
+    ----------
+    clock
+        The simulation clock.
+    compute
+        A function from a population index to a series or data frame
+        with that index.
+
+    """
+
+    def __init__(self, clock: Callable[[], pd.Timestamp],
+                 compute: Callable[[pd.Index], Union[pd.Series, pd.DataFrame]]):
+        self._clock = clock
+        self._compute = compute
+        self._time = None
+        self._index = None
+        self._values = None
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, index: pd.Index) -> Union[pd.Series, pd.DataFrame]:
+        time = self._clock()
+        if time != self._time:
+            self.invalidate()
+            self._time = time
+
+        if self._values is None:
+            self.misses += 1
+            self._index, self._values = index, self._compute(index)
+            return self._values
+
+        if index is self._index:
+            self.hits += 1
+            return self._values
+
+        missing = index.difference(self._values.index)
+        if missing.empty:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._values = pd.concat([self._values, self._compute(missing)])
+            self._index = None
+        return self._values.loc[index]
+
+    def invalidate(self, index: pd.Index = None):
+        """Drops cached values for ``index``, or for everyone if no index
+        is provided."""
+        if index is None or self._values is None:
+            self._index, self._values = None, None
+        else:
+            self._index, self._values = None, self._values.drop(index, errors='ignore')
+
+
+class MeanVarianceAccumulator:
+    """Streaming mean and variance of values observed in a fixed set of
+    strata.
+
+    Batches of values are summarized by stratum and folded into the running
+    count, mean and sum of squared deviations with the pairwise update of
+    Chan, Golub and LeVeque, so memory does not grow with the number of
+    observations.  Accumulators over the same strata can be merged exactly,
+    e.g. to combine results across random seeds.
+
+    Parameters
+    ----------
+    n_strata
+        The number of strata.
+
+    """
+
+    def __init__(self, n_strata: int):
+        self.count = np.zeros(n_strata)
+        self.mean = np.zeros(n_strata)
+        self.sum_of_squares = np.zeros(n_strata)
+
+    def update(self, strata: np.ndarray, values: np.ndarray):
+        """Adds values observed in the given strata.
+
+        Parameters
+        ----------
+        strata
+            The stratum code of each value.
+        values
+            The observed values.
+
+        """
+        n_strata = len(self.count)
+        count = np.bincount(strata, minlength=n_strata).astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.bincount(strata, values, minlength=n_strata) / count, 0.)
+        sum_of_squares = np.bincount(strata, (values - mean[strata]) ** 2, minlength=n_strata)
+        self._combine(count, mean, sum_of_squares)
+
+    def merge(self, other: 'MeanVarianceAccumulator'):
+        """Adds the values observed by another accumulator over the same
+        strata."""
+        self._combine(other.count, other.mean, other.sum_of_squares)
+
+    @property
+    def variance(self) -> np.ndarray:
+        """The population variance of each stratum, as ``np.var``."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.sum_of_squares / self.count
+
+    def _combine(self, count: np.ndarray, mean: np.ndarray, sum_of_squares: np.ndarray):
+        total = self.count + count
+        delta = mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(total > 0, count / total, 0.)
+        self.mean = self.mean + delta * weight
+        self.sum_of_squares = self.sum_of_squares + sum_of_squares + delta ** 2 * self.count * weight
+        self.count = total
+
+
 class BetaParams:
 
     def __init__(self, upper_bound, lower_bound, alpha, beta):
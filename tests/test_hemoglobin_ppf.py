@@ -0,0 +1,50 @@
+# Accuracy tests of the tabulated hemoglobin inverse CDF against the
+# exact scipy ensemble
+
+import numpy as np
+import pytest
+
+from vivarium_conic_lsff.distributions import TabulatedPPF, get_hemoglobin_ppf
+
+# Bounds of the propensity clipping used by the simulation.
+LOWER, UPPER = 0.0011, 0.998
+
+
+def get_parameters(random, n_rows):
+    return np.column_stack([random.uniform(90, 140, size=n_rows), random.uniform(8, 20, size=n_rows)])
+
+
+def get_queries(random, parameters, n):
+    rows = random.randint(len(parameters), size=n)
+    q = random.uniform(LOWER, UPPER, size=n)
+    # The bounds themselves are the most extreme queries.
+    q[:2] = LOWER, UPPER
+    return q, parameters[rows, 0], parameters[rows, 1]
+
+
+@pytest.mark.parametrize('tolerance', [1e-2, 1e-3, 1e-4])
+def test_tabulated_ppf_within_tolerance(tolerance):
+    random = np.random.RandomState(0)
+    parameters = get_parameters(random, 50)
+    ppf = TabulatedPPF(get_hemoglobin_ppf, LOWER, UPPER, tolerance)
+    ppf.add_parameters(parameters)
+
+    q, mean, sd = get_queries(random, parameters, 100_000)
+    error = np.abs(ppf(q, mean, sd) - get_hemoglobin_ppf(q, mean, sd))
+    assert error.max() <= tolerance
+
+
+def test_tabulated_ppf_adds_unseen_parameters():
+    random = np.random.RandomState(1234)
+    tolerance = 1e-3
+    ppf = TabulatedPPF(get_hemoglobin_ppf, LOWER, UPPER, tolerance)
+    ppf.add_parameters([[130, 2]])
+    initial_size = ppf.size
+    # A wide distribution needs a finer grid than the initial row.
+    unseen = np.vstack([get_parameters(random, 5), [[100, 20]]])
+
+    q, mean, sd = get_queries(random, unseen, 10_000)
+    error = np.abs(ppf(q, mean, sd) - get_hemoglobin_ppf(q, mean, sd))
+    assert len(ppf.parameters) == 7
+    assert ppf.size > initial_size
+    assert error.max() <= tolerance
@@ -0,0 +1,104 @@
+# Parity tests of the array based LBWSG boundary case correction
+# against the original pandas implementation
+
+import numpy as np, pandas as pd
+import pytest
+
+from vivarium_conic_lsff import globals as project_globals
+from vivarium_conic_lsff.distributions import (get_bounds_from_name, build_category_table,
+                                               correct_boundary_cases)
+
+GESTATION_EDGES = [0, 24, 26, 28, 30, 32, 34, 36, 37, 38, 40, 42]
+BIRTH_WEIGHT_EDGES = [0, 500, 1000, 1500, 2000, 2500, 3000, 3500, 4000, 4500]
+
+
+@pytest.fixture
+def category_dict():
+    # Heavy, very preterm cells are dropped to leave GBD style holes in the grid.
+    categories = {}
+    for gt_start, gt_end in zip(GESTATION_EDGES[:-1], GESTATION_EDGES[1:]):
+        for bw_start, bw_end in zip(BIRTH_WEIGHT_EDGES[:-1], BIRTH_WEIGHT_EDGES[1:]):
+            if bw_start >= 1000 + 150 * max(gt_end - 24, 0) or (gt_start, bw_start) == (37, 1000):
+                continue
+            categories[f'cat{len(categories) + 2}'] = (f'Birth prevalence - [{gt_start}, {gt_end}) wks, '
+                                                       f'[{bw_start}, {bw_end}) g')
+    categories[project_globals.LBWSG_MISSING_CATEGORY.CAT] = project_globals.LBWSG_MISSING_CATEGORY.NAME
+    return categories
+
+
+def get_categories_by_interval(category_dict):
+    intervals = []
+    for name in category_dict.values():
+        bw_start, bw_end, gt_start, gt_end = get_bounds_from_name(name)
+        intervals.append((pd.Interval(bw_start, bw_end, closed='left'),
+                          pd.Interval(gt_start, gt_end, closed='left')))
+    idx = pd.MultiIndex.from_tuples(intervals, names=project_globals.LBWSG_COLUMNS)
+    return pd.Series(list(category_dict.keys()), index=idx, name='cat')
+
+
+def reference_categorical_index(categories_by_interval, exposure):
+    exposure_bw_gt_index = exposure.set_index(project_globals.LBWSG_COLUMNS).index
+    return categories_by_interval.index.get_indexer(exposure_bw_gt_index, method=None)
+
+
+def reference_convert_boundary_cases(categories_by_interval, exposure):
+    cats = categories_by_interval.reset_index()
+    max_gt_by_bw = pd.Series({bw_interval: pd.Index(group.gestation_time).right.max()
+                              for bw_interval, group in cats.groupby(project_globals.BIRTH_WEIGHT)})
+    max_bw_by_gt = pd.Series({gt_interval: pd.Index(group.birth_weight).right.max()
+                              for gt_interval, group in cats.groupby(project_globals.GESTATION_TIME)})
+
+    birth_weight = exposure[project_globals.BIRTH_WEIGHT]
+    gestation_time = exposure[project_globals.GESTATION_TIME]
+    eps = 1e-4
+    outside_bounds = reference_categorical_index(categories_by_interval, exposure) == -1
+    shift_down = outside_bounds & (
+            (birth_weight < 1000)
+            | ((1000 < birth_weight) & (birth_weight < project_globals.MAX_BIRTH_WEIGHT)
+               & (40 < gestation_time))
+    )
+    shift_left = outside_bounds & (
+        ((1000 < birth_weight) & (gestation_time < 34))
+            | ((project_globals.MAX_BIRTH_WEIGHT < birth_weight)
+               & (gestation_time < project_globals.MAX_GESTATIONAL_TIME))
+    )
+    tmrel = outside_bounds & (
+            (project_globals.MAX_BIRTH_WEIGHT < birth_weight)
+            & (project_globals.MAX_GESTATIONAL_TIME < gestation_time)
+    )
+
+    # Interval lookups, as ``.loc`` with float keys on an interval index.
+    bw_position = pd.IntervalIndex(max_gt_by_bw.index).get_indexer(exposure.loc[shift_down, project_globals.BIRTH_WEIGHT])
+    exposure.loc[shift_down, project_globals.GESTATION_TIME] = max_gt_by_bw.values[bw_position] - eps
+
+    gt_position = pd.IntervalIndex(max_bw_by_gt.index).get_indexer(exposure.loc[shift_left, project_globals.GESTATION_TIME])
+    exposure.loc[shift_left, project_globals.BIRTH_WEIGHT] = max_bw_by_gt.values[gt_position] - eps
+
+    exposure.loc[tmrel, project_globals.GESTATION_TIME] = project_globals.MAX_GESTATIONAL_TIME - eps
+    exposure.loc[tmrel, project_globals.BIRTH_WEIGHT] = project_globals.MAX_BIRTH_WEIGHT - eps
+    return exposure
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_correct_boundary_cases_matches_reference(category_dict, seed):
+    random = np.random.RandomState(seed)
+    n = 5000
+    # Mix continuous values over and beyond the grid with values exactly on bin edges.
+    birth_weight = np.where(random.uniform(size=n) < 0.8,
+                            random.uniform(100, 5500, size=n),
+                            random.choice(BIRTH_WEIGHT_EDGES[1:], size=n).astype(float))
+    gestation_time = np.where(random.uniform(size=n) < 0.8,
+                              random.uniform(20, 45, size=n),
+                              random.choice(GESTATION_EDGES[1:], size=n).astype(float))
+    exposure = pd.DataFrame({project_globals.BIRTH_WEIGHT: birth_weight,
+                             project_globals.GESTATION_TIME: gestation_time})
+
+    categories_by_interval = get_categories_by_interval(category_dict)
+    expected = reference_convert_boundary_cases(categories_by_interval, exposure.copy())
+    expected_index = reference_categorical_index(categories_by_interval, expected)
+
+    values = exposure[project_globals.LBWSG_COLUMNS].values.astype(float)
+    category_index = correct_boundary_cases(build_category_table(category_dict).grid, values)
+
+    assert np.allclose(values, expected.values, equal_nan=True, rtol=0, atol=1e-9)
+    assert np.array_equal(category_index, expected_index)
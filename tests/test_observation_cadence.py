@@ -0,0 +1,79 @@
+# Validation of observers' thinned observation cadence against
+# observing on every time step
+
+import numpy as np, pandas as pd
+import pytest
+
+from vivarium_conic_lsff.components.observers import get_observation_weight
+
+SIM_START = pd.Timestamp('2020-01-01')
+STEP_SIZE = pd.Timedelta(days=1)
+AGE_STARTS = np.array([0, 7 / 365, 28 / 365, 1])
+EXIT_AGE = 5
+
+
+def get_step_times(sim_start, sim_end, step_size):
+    times = []
+    time = sim_start
+    while time < sim_end:
+        times.append(time)
+        time += step_size
+    return times
+
+
+def simulate_counts(seed, sim_end, n_simulants=2_000):
+    """Simulates a two state disease with aging and mortality and returns
+    the number of simulants in each (state, age group) at the start of
+    every time step.  Simulants who die or age out are replaced with
+    newborns so that every age group stays populated."""
+    random = np.random.RandomState(seed)
+    step = STEP_SIZE / pd.Timedelta(days=365)
+    age = random.uniform(0, EXIT_AGE, size=n_simulants)
+    sick = np.zeros(n_simulants, dtype=bool)
+
+    counts = []
+    for _ in get_step_times(SIM_START, sim_end, STEP_SIZE):
+        age_group = np.searchsorted(AGE_STARTS, age, side='right') - 1
+        counts.append(np.bincount(sick * len(AGE_STARTS) + age_group, minlength=2 * len(AGE_STARTS)))
+
+        draw = random.uniform(size=n_simulants)
+        sick = np.where(sick, draw >= 0.1, draw < 0.01)
+        died = random.uniform(size=n_simulants) < 0.0005
+        age += step
+        replaced = died | (age >= EXIT_AGE)
+        age[replaced], sick[replaced] = 0, False
+    return np.array(counts)
+
+
+def get_person_time(counts, sim_end, interval):
+    times = get_step_times(SIM_START, sim_end, STEP_SIZE)
+    weights = np.array([get_observation_weight(time, STEP_SIZE, SIM_START, sim_end, interval) / pd.Timedelta(days=365)
+                        for time in times])
+    return weights @ counts
+
+
+@pytest.mark.parametrize('interval', [1, 2, 7, 30, 365, 1000])
+def test_observation_weights_cover_simulation(interval):
+    # The simulation end does not fall on a step boundary, so the last time
+    # step runs past it.
+    sim_end = SIM_START + pd.Timedelta(days=100, hours=12)
+    times = get_step_times(SIM_START, sim_end, STEP_SIZE)
+    weights = [get_observation_weight(time, STEP_SIZE, SIM_START, sim_end, interval) for time in times]
+
+    observed = [step for step, weight in enumerate(weights) if weight]
+    assert observed == list(range(0, len(times), interval))
+    assert sum(weights, pd.Timedelta(0)) == len(times) * STEP_SIZE
+
+
+@pytest.mark.parametrize('interval', [2, 7])
+def test_thinned_person_time_matches_per_step(interval):
+    sim_end = SIM_START + pd.Timedelta(days=365)
+    replicates = np.array([get_person_time(simulate_counts(seed, sim_end), sim_end, interval=1)
+                           for seed in range(1, 6)])
+    monte_carlo_sd = replicates.std(axis=0, ddof=1)
+
+    counts = simulate_counts(0, sim_end)
+    per_step = get_person_time(counts, sim_end, interval=1)
+    thinned = get_person_time(counts, sim_end, interval)
+
+    assert np.all(np.abs(thinned - per_step) <= 3 * monte_carlo_sd)